@@ -4,6 +4,7 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
@@ -27,6 +28,9 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Arbitrary key for the advisory lock that serialises concurrent upgrades
+MIGRATION_LOCK_ID = 10000
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -83,6 +87,13 @@ def run_migrations_online() -> None:
         )
 
         with context.begin_transaction():
+            # Several workers/pods may run upgrades at the same time on startup;
+            # hold a transaction-scoped advisory lock so only one applies them
+            if connection.dialect.name == "postgresql":
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                    {"lock_id": MIGRATION_LOCK_ID}
+                )
             context.run_migrations()
 
 
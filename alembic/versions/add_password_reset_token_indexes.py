@@ -0,0 +1,38 @@
+"""Add indexes for password_reset_tokens lookups
+
+Revision ID: add_prt_indexes
+Revises: remove_duplicate_pic_url
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_prt_indexes'
+down_revision = 'remove_duplicate_pic_url'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partial index for invalidating a user's outstanding tokens
+    op.create_index(
+        'ix_password_reset_tokens_user_id_unused',
+        'password_reset_tokens',
+        ['user_id'],
+        postgresql_where=sa.text('used = false')
+    )
+
+    # Range index for the expired-token cleanup
+    op.create_index(
+        'ix_password_reset_tokens_expires_at',
+        'password_reset_tokens',
+        ['expires_at']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_password_reset_tokens_expires_at', table_name='password_reset_tokens')
+    op.drop_index('ix_password_reset_tokens_user_id_unused', table_name='password_reset_tokens')
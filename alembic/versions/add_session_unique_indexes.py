@@ -0,0 +1,40 @@
+"""Add unique indexes for session tracking and session volumes
+
+Revision ID: add_session_unique_idx
+Revises: add_prt_indexes
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_session_unique_idx'
+down_revision = 'add_prt_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One scan per trainer-customer pair per day
+    op.create_index(
+        'uq_session_tracking_trainer_qr_date',
+        'session_tracking',
+        ['trainer_id', 'qr_code_id', 'session_date'],
+        unique=True
+    )
+
+    # One live volume per trainer-customer-period
+    op.create_index(
+        'uq_session_volumes_trainer_customer_period',
+        'session_volumes',
+        ['trainer_id', 'customer_id', 'period'],
+        unique=True,
+        postgresql_where=sa.text('deleted_at IS NULL')
+    )
+
+
+def downgrade():
+    op.drop_index('uq_session_volumes_trainer_customer_period', table_name='session_volumes')
+    op.drop_index('uq_session_tracking_trainer_qr_date', table_name='session_tracking')
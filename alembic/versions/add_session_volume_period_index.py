@@ -0,0 +1,30 @@
+"""Add period index for session volumes
+
+Revision ID: add_sv_period_idx
+Revises: add_session_unique_idx
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_sv_period_idx'
+down_revision = 'add_session_unique_idx'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Monthly volume lookups filter by period, then optionally trainer and customer
+    op.create_index(
+        'ix_session_volumes_period_trainer_customer',
+        'session_volumes',
+        ['period', 'trainer_id', 'customer_id'],
+        postgresql_where=sa.text('deleted_at IS NULL')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_session_volumes_period_trainer_customer', table_name='session_volumes')
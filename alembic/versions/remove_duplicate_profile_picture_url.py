@@ -17,6 +17,11 @@ depends_on = None
 
 
 def upgrade():
+    # DROP COLUMN needs an ACCESS EXCLUSIVE lock; give up quickly instead of
+    # queueing behind long transactions and blocking every query behind us.
+    # The application no longer maps these columns, so a retry is safe.
+    op.execute("SET LOCAL lock_timeout = '2s'")
+
     # Remove profile_picture_url from customers table
     op.drop_column('customers', 'profile_picture_url')
 
@@ -1,11 +1,16 @@
 import logging
 from typing import Optional
 
+import redis
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, SessionLocal
+from app.core.token_store import refresh_token_store
 from app.core.security import (
     create_token_for_user, 
     create_tokens_for_user,
@@ -31,13 +36,44 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Static responses, built once at import
+LOGOUT_RESPONSE = MessageResponse.model_construct(message="Successfully logged out")
+FORGOT_PASSWORD_RESPONSE = MessageResponse.model_construct(
+    message="If an account exists with this email, a password reset link has been sent"
+)
+PASSWORD_CHANGED_RESPONSE = MessageResponse.model_construct(message="Password changed successfully")
+PASSWORD_RESET_RESPONSE = MessageResponse.model_construct(message="Password reset successfully")
+
+# Emails that recently requested a reset; repeat requests inside the window are dropped
+_recent_reset_requests = TTLCache(maxsize=10000, ttl=60)
+
+def _issue_password_reset(email: str) -> None:
+    """Look up the user and create a reset token (runs after the response is sent)"""
+    db = SessionLocal()
+    try:
+        user = user_crud.get_by_email(db, email=email)
+        if user and user_crud.is_active(user):
+            reset_token = password_reset_token_crud.create_for_user(
+                db,
+                user_id=user.id,
+                expires_in_hours=24
+            )
+            logger.info(f"Password reset token generated for {email}")
+            # No email delivery yet; surface the token only in development
+            if settings.DEBUG_MODE:
+                logger.debug("Password reset token for %s: %s", email, reset_token.token)
+    finally:
+        db.close()
+
 @router.post("/login", response_model=LoginResponse)
 async def login(
     user_credentials: UserLogin,
     db: Session = Depends(get_db)
 ):
     """Login user and return JWT token"""
-    user = user_crud.authenticate(
+    # bcrypt is CPU-bound, keep it off the event loop
+    user = await run_in_threadpool(
+        user_crud.authenticate,
         db,
         email=user_credentials.email,
         password=user_credentials.password
@@ -63,19 +99,19 @@ async def login(
         role=role_name
     )
 
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer",
-        "user_id": str(user.id),
-        "email": user.email,
-        "role": role_name,
-        "first_name": user.first_name,
-        "last_name": user.last_name
-    }
+    return LoginResponse.model_construct(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="bearer",
+        user_id=str(user.id),
+        email=user.email,
+        role=role_name,
+        first_name=user.first_name,
+        last_name=user.last_name
+    )
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(
+def refresh_token(
     refresh_data: RefreshToken,
     db: Session = Depends(get_db)
 ):
@@ -96,6 +132,31 @@ async def refresh_token(
             detail="Invalid token payload"
         )
 
+    # Each refresh token is single use; seeing a rotated one again means it
+    # was copied, so revoke the whole family and force a fresh login
+    jti = payload.get("jti")
+    try:
+        revoked = refresh_token_store.is_revoked(user_id, payload.get("iat"))
+        if not revoked and jti and not refresh_token_store.rotate(jti):
+            refresh_token_store.revoke_user(user_id)
+            logger.warning(f"Refresh token reuse detected for user {user_id}; revoked outstanding tokens")
+            revoked = True
+    except redis.RedisError as e:
+        logger.error(f"Refresh token store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token refresh is temporarily unavailable"
+        )
+
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Always re-read the user so deactivation, deletion and role or email
+    # changes take effect on the next refresh
     user = user_crud.get(db, id=user_id)
     if not user:
         raise HTTPException(
@@ -109,26 +170,26 @@ async def refresh_token(
             detail="Inactive user"
         )
 
-    role_name = user.role.name if user.role else None
     access_token, new_refresh_token = create_tokens_for_user(
         user_id=user.id,
         email=user.email,
-        role=role_name
+        role=user.role.name if user.role else None
     )
     
-    return {
-        "access_token": access_token,
-        "refresh_token": new_refresh_token,
-        "token_type": "bearer"
-    }
+    return Token.model_construct(
+        access_token=access_token,
+        refresh_token=new_refresh_token,
+        token_type="bearer"
+    )
 
 @router.post("/change-password", response_model=MessageResponse)
-async def change_password(
+def change_password(
     password_data: ChangePassword,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Change the current user's password"""
+    # Sync handler: bcrypt and the DB update run in the threadpool, off the event loop
     if not verify_password(password_data.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -144,39 +205,32 @@ async def change_password(
     hashed_password = get_password_hash(password_data.new_password)
     user_crud.update(db, db_obj=current_user, obj_in={"password_hash": hashed_password})
     
-    return {"message": "Password changed successfully"}
+    return PASSWORD_CHANGED_RESPONSE
 
 @router.post("/logout", response_model=MessageResponse)
 async def logout(
     current_user: User = Depends(get_current_active_user)
 ):
     """Logout user"""
-    return {"message": "Successfully logged out"}
+    return LOGOUT_RESPONSE
 
 @router.post("/forgot-password", response_model=MessageResponse)
 async def forgot_password(
     forgot_data: ForgotPassword,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
     """Request a password reset token"""
-    user = user_crud.get_by_email(db, email=forgot_data.email)
-
-    message = "If an account exists with this email, a password reset link has been sent"
-    
-    if user and user_crud.is_active(user):
-        reset_token = password_reset_token_crud.create_for_user(
-            db,
-            user_id=user.id,
-            expires_in_hours=24
-        )
-        logger.info(f"Password reset token generated for {user.email}: {reset_token.token}")
-        print(f"Password reset token for {user.email}: {reset_token.token}")
+    # The lookup and insert happen after the response, so timing does not
+    # reveal whether the account exists
+    email = forgot_data.email.lower()
+    if email not in _recent_reset_requests:
+        _recent_reset_requests[email] = True
+        background_tasks.add_task(_issue_password_reset, forgot_data.email)
     
-    return {"message": message}
+    return FORGOT_PASSWORD_RESPONSE
 
 @router.post("/reset-password", response_model=MessageResponse)
-async def reset_password(
+def reset_password(
     reset_data: ResetPassword,
     db: Session = Depends(get_db)
 ):
@@ -193,4 +247,4 @@ async def reset_password(
     user_crud.update(db, db_obj=user, obj_in={"password_hash": hashed_password})
     logger.info(f"Password reset successfully for user {user.email}")
     
-    return {"message": "Password reset successfully"}
\ No newline at end of file
+    return PASSWORD_RESET_RESPONSE
\ No newline at end of file
@@ -1,14 +1,15 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.core.auth import get_current_active_user, require_trainer_or_admin
 from app.core.database import get_db
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
 from app.crud.customer import customer_crud
-from app.crud.trainer import trainer_crud
+from app.crud.qr_code import qr_code_crud
 from app.crud.user import user_crud
 from app.models.user import User
 from app.schemas.customer import CustomerResponse, CustomerListResponse, CustomerUpdate
@@ -33,8 +34,10 @@ class CustomerProgressResponse(BaseModel):
 
 @router.get("/", response_model=List[CustomerListResponse])
 async def list_customers(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[UUID] = Query(None),
     current_user: User = Depends(require_trainer_or_admin),
     db: Session = Depends(get_db)
 ):
@@ -42,7 +45,8 @@ async def list_customers(
     List all active customers.
     Only trainers and admins can view customer list.
     """
-    customers = customer_crud.get_active(db, skip=skip, limit=limit)
+    customers = customer_crud.get_active(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, [customer.user_id for customer in customers], limit)
     return customers
 
 @router.get("/{customer_id}", response_model=CustomerResponse)
@@ -57,7 +61,10 @@ async def get_customer_details(
     Trainers can view their assigned customers.
     Admins can view any customer.
     """
-    customer = customer_crud.get_by_user_id(db, user_id=customer_id)
+    if current_user.id == customer_id:
+        customer = current_user.customer
+    else:
+        customer = customer_crud.get_by_user_id(db, user_id=customer_id)
     
     if not customer:
         raise HTTPException(
@@ -66,13 +73,14 @@ async def get_customer_details(
         )
     
     # Permission check
+    role = current_user.role_name
     if current_user.id == customer_id:
         # Users can always view their own data
         pass
-    elif current_user.has_role("Admin"):
+    elif role == "Admin":
         # Admins can view any customer
         pass
-    elif current_user.has_role("Trainer"):
+    elif role == "Trainer":
         # Trainers can only view their assigned customers
         if customer.trainer_id != current_user.id:
             raise HTTPException(
@@ -100,7 +108,10 @@ async def update_customer_info(
     Only admins can change trainer assignments.
     Trainers can update profile data for their assigned customers.
     """
-    customer = customer_crud.get_by_user_id(db, user_id=customer_id)
+    if current_user.id == customer_id:
+        customer = current_user.customer
+    else:
+        customer = customer_crud.get_by_user_id(db, user_id=customer_id)
     
     if not customer:
         raise HTTPException(
@@ -111,15 +122,16 @@ async def update_customer_info(
     # Permission checks
     can_update_profile = False
     can_update_trainer = False
+    role = current_user.role_name
     
     if current_user.id == customer_id:
         # Customers can update their own profile data
         can_update_profile = True
-    elif current_user.has_role("Admin"):
+    elif role == "Admin":
         # Admins can update everything
         can_update_profile = True
         can_update_trainer = True
-    elif current_user.has_role("Trainer") and customer.trainer_id == current_user.id:
+    elif role == "Trainer" and customer.trainer_id == current_user.id:
         # Trainers can update profile data for their assigned customers
         can_update_profile = True
     else:
@@ -128,48 +140,51 @@ async def update_customer_info(
             detail="Not enough permissions to update this customer"
         )
     
+    # Echoing the current trainer_id back is a no-op, not a reassignment
+    trainer_changed = (
+        customer_update.trainer_id is not None
+        and customer_update.trainer_id != customer.trainer_id
+    )
+    
     # Validate trainer assignment changes
-    if customer_update.trainer_id is not None and not can_update_trainer:
+    if trainer_changed and not can_update_trainer:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only administrators can change trainer assignments"
         )
     
     # If trainer assignment is being changed, validate the trainer
-    if customer_update.trainer_id is not None and can_update_trainer:
-        if customer_update.trainer_id != customer.trainer_id:  # Only check if actually changing
-            trainer_user = user_crud.get(db, id=customer_update.trainer_id)
-            if not trainer_user or not user_crud.is_active(trainer_user):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Trainer not found or inactive"
-                )
-            if not trainer_user.has_role("Trainer"):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="User is not a trainer"
-                )
+    if trainer_changed:
+        trainer_user = user_crud.get(db, id=customer_update.trainer_id)
+        if not trainer_user or not user_crud.is_active(trainer_user):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Trainer not found or inactive"
+            )
+        if trainer_user.role_name != "Trainer":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User is not a trainer"
+            )
     
     # Filter update data based on permissions
     update_data = {}
+    # profile_picture_url lives on profiles now (see /profiles/upload-picture)
     if can_update_profile:
-        if customer_update.profile_picture_url is not None:
-            update_data["profile_picture_url"] = customer_update.profile_picture_url
         if customer_update.profile_data is not None:
             update_data["profile_data"] = customer_update.profile_data
     
-    if can_update_trainer and customer_update.trainer_id is not None:
+    if trainer_changed:
         update_data["trainer_id"] = customer_update.trainer_id
     
+    # Nothing to change - PUT is idempotent, return the current state
     if not update_data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No valid update data provided"
-        )
+        return customer
     
-    # Create update object
-    filtered_update = CustomerUpdate(**update_data)
-    customer = customer_crud.update(db, db_obj=customer, obj_in=filtered_update)
+    # update_data is already validated by CustomerUpdate, pass it straight through
+    customer = customer_crud.update(db, db_obj=customer, obj_in=update_data)
+    if trainer_changed:
+        qr_code_crud.invalidate_scan_subject(db, user_id=customer_id)
     
     return customer
 
@@ -184,7 +199,7 @@ async def get_customer_trainer(
     Customers can view their own trainer.
     Trainers and admins can view any customer's trainer.
     """
-    customer = customer_crud.get_by_user_id(db, user_id=customer_id)
+    customer = customer_crud.get_by_user_id_with_trainer(db, user_id=customer_id)
     
     if not customer:
         raise HTTPException(
@@ -193,19 +208,16 @@ async def get_customer_trainer(
         )
     
     # Permission check
-    if (current_user.id != customer_id and 
-        not current_user.has_role("Admin") and 
-        not current_user.has_role("Trainer")):
+    if current_user.id != customer_id and current_user.role_name not in ("Admin", "Trainer"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
     
-    if not customer.trainer_id:
+    if not customer.trainer_id or not customer.trainer:
         return None
     
-    trainer = trainer_crud.get_by_user_id(db, user_id=customer.trainer_id)
-    return trainer
+    return customer.trainer.trainer
 
 @router.post("/{customer_id}/request-trainer")
 async def request_trainer_assignment(
@@ -226,13 +238,14 @@ async def request_trainer_assignment(
             detail="You can only request trainers for yourself"
         )
     
-    if not current_user.has_role("Customer"):
+    if current_user.role_name != "Customer":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only customers can request trainer assignments"
         )
     
-    customer = customer_crud.get_by_user_id(db, user_id=customer_id)
+    # Only reachable for the caller's own record, already loaded with the user
+    customer = current_user.customer
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -247,6 +260,7 @@ async def request_trainer_assignment(
         )
     
     # If specific trainer is requested, validate they exist and are active
+    trainer_info = ""
     if request_data.trainer_id:
         trainer_user = user_crud.get(db, id=request_data.trainer_id)
         if not trainer_user or not user_crud.is_active(trainer_user):
@@ -254,15 +268,11 @@ async def request_trainer_assignment(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Requested trainer not found or inactive"
             )
-        if not trainer_user.has_role("Trainer"):
+        if trainer_user.role_name != "Trainer":
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Requested user is not a trainer"
             )
-    
-    trainer_info = ""
-    if request_data.trainer_id:
-        trainer_user = user_crud.get(db, id=request_data.trainer_id)
         trainer_info = f" for trainer {trainer_user.first_name} {trainer_user.last_name}"
 
     return {
@@ -279,13 +289,13 @@ async def get_my_progress(
     Get progress and statistics for the current customer.
     Only customers can access this endpoint for their own data.
     """
-    if not current_user.has_role("Customer"):
+    if current_user.role_name != "Customer":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only customers can access progress statistics"
         )
     
-    customer = customer_crud.get_by_user_id(db, user_id=current_user.id)
+    customer = current_user.customer
     if not customer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -293,17 +303,16 @@ async def get_my_progress(
         )
     
     # Calculate profile completion percentage
-    profile_fields = [
-        current_user.first_name,
-        current_user.last_name,
-        current_user.phone_number,
-        current_user.location,
-        customer.profile_picture_url,
-        customer.profile_data.get("bio") if customer.profile_data else None,
-    ]
-    
-    completed_fields = sum(1 for field in profile_fields if field)
-    profile_completion = int((completed_fields / len(profile_fields)) * 100)
+    profile = current_user.profile
+    completed_fields = (
+        bool(current_user.first_name)
+        + bool(current_user.last_name)
+        + bool(current_user.phone_number)
+        + bool(current_user.location)
+        + bool(profile and profile.profile_picture_url)
+        + bool((customer.profile_data or {}).get("bio"))
+    )
+    profile_completion = completed_fields * 100 // 6
     
     total_sessions = 0
     sessions_this_month = 0
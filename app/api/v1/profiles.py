@@ -1,47 +1,87 @@
+import logging
 from typing import Optional
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import os
-import shutil
+import re
+from functools import lru_cache
 from pathlib import Path
 
+import aiofiles
+
 from app.core.auth import get_current_active_user
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.responses import UTCORJSONResponse
 from app.crud.profile import profile_crud
 from app.crud.user import user_crud
 from app.models.user import User
-from app.schemas.profile import ProfileResponse, ProfileUpdate, ProfileCreate
+from app.schemas.profile import ProfileResponse, ProfileUpdate, ProfileCreate, profile_response_row
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Read size for streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Slack for multipart boundaries/headers when comparing Content-Length to the file limit
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Leading magic bytes of accepted image formats -> stored file extension
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpg",
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+}
+
+# Upload settings resolved once at import
+MAX_FILE_SIZE = settings.MAX_FILE_SIZE_MB * 1024 * 1024  # Convert MB to bytes
+FILE_TOO_LARGE_DETAIL = f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE_MB}MB"
+PROFILE_PICS_DIR = Path(settings.UPLOAD_DIR) / "profile_pictures"
+PROFILE_PICS_URL = f"{settings.MEDIA_BASE_URL}/profile_pictures"
+PROFILE_PICS_ROOT = PROFILE_PICS_DIR.resolve()
+
+# Stored picture paths are "<2-hex shard>/<file>" or a legacy flat "<file>"
+PICTURE_RELPATH_RE = re.compile(r"(?:[0-9a-f]{2}/)?[\w-]+\.[A-Za-z0-9]+")
+
+@lru_cache(maxsize=None)
+def _profile_pics_shard_dir(shard: str) -> Path:
+    """Create a profile picture shard directory on first use and return it"""
+    shard_dir = PROFILE_PICS_DIR / shard
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    return shard_dir
+
+def _profile_picture_path(picture_url: str) -> Optional[Path]:
+    """
+    Map a stored picture URL back to its file (handles sharded and legacy flat paths).
+    Returns None for anything that does not resolve inside the upload directory.
+    """
+    relpath = picture_url.split("/profile_pictures/", 1)[-1]
+    if not PICTURE_RELPATH_RE.fullmatch(relpath):
+        return None
+    file_path = (PROFILE_PICS_DIR / relpath).resolve()
+    if not file_path.is_relative_to(PROFILE_PICS_ROOT):
+        return None
+    return file_path
+
 @router.get("/me", response_model=ProfileResponse)
-async def get_my_profile(
+def get_my_profile(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's profile"""
-    profile = profile_crud.get_by_user_id(db, user_id=current_user.id)
-    
-    if not profile:
-        # Create a default profile if it doesn't exist
-        profile = profile_crud.create_for_user(
-            db, 
-            user_id=current_user.id,
-            obj_in=ProfileCreate(
-                user_id=current_user.id,
-                bio=None,
-                profile_picture_url=None,
-                emergency_contact=None,
-                preferences={}
-            )
-        )
+    # Creates a default profile if it doesn't exist
+    profile = profile_crud.get_or_create_for_user(db, user_id=current_user.id)
     
-    return profile
+    # Trusted DB values go straight to orjson; response_model still documents the shape
+    return UTCORJSONResponse(content=profile_response_row(profile, current_user))
 
 @router.put("/me", response_model=ProfileResponse)
-async def update_my_profile(
+def update_my_profile(
     profile_update: ProfileUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -66,7 +106,7 @@ async def update_my_profile(
     return profile
 
 @router.get("/{user_id}", response_model=ProfileResponse)
-async def get_user_profile(
+def get_user_profile(
     user_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -77,23 +117,21 @@ async def get_user_profile(
     Trainers and Admins can view any profile.
     """
     # Check permissions
-    if (user_id != current_user.id and 
-        not current_user.has_role("Admin") and 
-        not current_user.has_role("Trainer")):
+    if user_id != current_user.id and current_user.role_name not in ("Admin", "Trainer"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions to view this profile"
         )
     
-    # Check if user exists
-    user = user_crud.get(db, id=user_id)
+    # Check if user exists (profile is loaded in the same query)
+    user = user_crud.get_with_profile(db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    profile = profile_crud.get_by_user_id(db, user_id=user_id)
+    profile = user.profile
     
     if not profile:
         raise HTTPException(
@@ -103,8 +141,47 @@ async def get_user_profile(
     
     return profile
 
+def _store_profile_picture(
+    db: Session, user_id: UUID, file_url: str
+):
+    """Point the user's profile at a newly saved picture, removing the old file"""
+    profile = profile_crud.get_by_user_id(db, user_id=user_id)
+    
+    if not profile:
+        # Create profile with picture
+        profile = profile_crud.create_for_user(
+            db,
+            user_id=user_id,
+            obj_in=ProfileCreate(
+                user_id=user_id,
+                profile_picture_url=file_url,
+                bio=None,
+                emergency_contact=None,
+                preferences={}
+            )
+        )
+    else:
+        # Delete old picture file if it exists
+        if profile.profile_picture_url:
+            old_file_path = _profile_picture_path(profile.profile_picture_url)
+            try:
+                if old_file_path is not None:
+                    old_file_path.unlink(missing_ok=True)
+            except OSError:
+                pass  # Ignore errors when deleting old file
+        
+        # Update profile with new picture URL
+        profile = profile_crud.update_profile_picture(
+            db, 
+            profile=profile, 
+            picture_url=file_url
+        )
+    
+    return profile
+
 @router.post("/upload-picture", response_model=ProfileResponse)
 async def upload_profile_picture(
+    request: Request,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -114,92 +191,72 @@ async def upload_profile_picture(
     Accepts image files (jpg, jpeg, png, gif).
     Max file size is controlled by MAX_FILE_SIZE_MB in settings.
     """
-    # Validate file type
-    allowed_extensions = ["jpg", "jpeg", "png", "gif"]
-    file_extension = file.filename.split(".")[-1].lower()
+    # Validate file type from the content itself, not the client-supplied filename
+    header = await file.read(12)
+    await file.seek(0)
+    file_extension = next(
+        (ext for signature, ext in IMAGE_SIGNATURES.items() if header.startswith(signature)),
+        None
+    )
     
-    if file_extension not in allowed_extensions:
+    if file_extension is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type not allowed. Allowed types: {', '.join(allowed_extensions)}"
+            detail="File type not allowed. Allowed types: jpg, jpeg, png, gif"
         )
     
-    # Validate file size (if MAX_FILE_SIZE_MB is set)
-    if hasattr(settings, 'MAX_FILE_SIZE_MB'):
-        max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024  # Convert MB to bytes
-        
-        # Read file content to check size
-        contents = await file.read()
-        if len(contents) > max_size:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE_MB}MB"
-            )
-        
-        # Reset file pointer
-        await file.seek(0)
-    
-    # Create upload directory if it doesn't exist
-    upload_dir = Path(settings.UPLOAD_DIR if hasattr(settings, 'UPLOAD_DIR') else "uploads")
-    profile_pics_dir = upload_dir / "profile_pictures"
-    profile_pics_dir.mkdir(parents=True, exist_ok=True)
+    # Size limit is enforced while streaming to disk; a declared body size
+    # well over the limit is rejected before touching the file
+    declared_size = request.headers.get("content-length", "")
+    if declared_size.isdigit() and int(declared_size) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=FILE_TOO_LARGE_DETAIL
+        )
     
-    # Generate unique filename
-    import uuid
-    unique_filename = f"{current_user.id}_{uuid.uuid4()}.{file_extension}"
-    file_path = profile_pics_dir / unique_filename
+    # Generate unique filename; files are spread over 256 subdirectories
+    # so no single directory grows unbounded
+    file_uuid = uuid4()
+    shard = file_uuid.hex[:2]
+    unique_filename = f"{current_user.id}_{file_uuid}.{file_extension}"
+    file_path = _profile_pics_shard_dir(shard) / unique_filename
     
-    # Save file
+    # Save file in fixed-size chunks so memory stays bounded and the event loop isn't blocked
+    too_large = False
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        total = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > MAX_FILE_SIZE:
+                    too_large = True
+                    break
+                await buffer.write(chunk)
     except Exception as e:
+        file_path.unlink(missing_ok=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save file: {str(e)}"
         )
     finally:
-        file.file.close()
-
-    file_url = f"/static/profile_pictures/{unique_filename}"
+        await file.close()
     
-    profile = profile_crud.get_by_user_id(db, user_id=current_user.id)
-    
-    if not profile:
-        # Create profile with picture
-        profile = profile_crud.create_for_user(
-            db,
-            user_id=current_user.id,
-            obj_in=ProfileCreate(
-                user_id=current_user.id,
-                profile_picture_url=file_url,
-                bio=None,
-                emergency_contact=None,
-                preferences={}
-            )
-        )
-    else:
-        # Delete old picture file if it exists
-        if profile.profile_picture_url:
-            old_filename = profile.profile_picture_url.split("/")[-1]
-            old_file_path = profile_pics_dir / old_filename
-            if old_file_path.exists():
-                try:
-                    old_file_path.unlink()
-                except Exception:
-                    pass  # Ignore errors when deleting old file
-        
-        # Update profile with new picture URL
-        profile = profile_crud.update_profile_picture(
-            db, 
-            profile=profile, 
-            picture_url=file_url
+    if too_large:
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=FILE_TOO_LARGE_DETAIL
         )
+
+    file_url = f"{PROFILE_PICS_URL}/{shard}/{unique_filename}"
     
-    return profile
+    # Profile update (and old file cleanup) is blocking, keep it off the event loop
+    return await run_in_threadpool(
+        _store_profile_picture, db, current_user.id, file_url
+    )
 
 @router.delete("/picture")
-async def delete_profile_picture(
+def delete_profile_picture(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -216,18 +273,14 @@ async def delete_profile_picture(
         )
     
     # Delete the file
-    upload_dir = Path(settings.UPLOAD_DIR if hasattr(settings, 'UPLOAD_DIR') else "uploads")
-    profile_pics_dir = upload_dir / "profile_pictures"
-    
-    filename = profile.profile_picture_url.split("/")[-1]
-    file_path = profile_pics_dir / filename
-    
-    if file_path.exists():
-        try:
-            file_path.unlink()
-        except Exception as e:
-            # Log error but continue to clear the URL from database
-            print(f"Error deleting file: {e}")
+    file_path = _profile_picture_path(profile.profile_picture_url)
+    
+    try:
+        if file_path is not None:
+            file_path.unlink(missing_ok=True)
+    except OSError as e:
+        # Log error but continue to clear the URL from database
+        logger.warning(f"Error deleting profile picture {file_path}: {e}")
     
     # Clear the URL from the profile
     profile = profile_crud.update_profile_picture(
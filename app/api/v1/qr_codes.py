@@ -1,15 +1,22 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
+from uuid import UUID
 from io import BytesIO
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 import qrcode
+from qrcode.image.pil import PilImage
 
 from app.core.auth import get_current_active_user, require_trainer_or_admin, require_admin
 from app.core.database import get_db
+from app.core.responses import UTCORJSONResponse
 from app.crud.qr_code import qr_code_crud
 from app.crud.user import user_crud
 from app.models.user import User
@@ -24,22 +31,56 @@ class ScanQRCodeRequest(BaseModel):
 class ScanQRCodeResponse(BaseModel):
     """Schema for QR code scan response"""
     valid: bool
-    user_id: Optional[str] = None
+    user_id: Optional[UUID] = None
     user_name: Optional[str] = None
     user_role: Optional[str] = None
     message: str
-    scanned_at: str
+    scanned_at: datetime
 
 class QRCodeDisplayResponse(BaseModel):
     """Schema for QR code display (customer view)"""
     token: str
     qr_url: Optional[str] = None  # URL for QR code image generation
     user_name: str
-    created_at: str
+    created_at: datetime
     instructions: str
 
+# Fixed QR code settings, built once rather than per render
+_QR_KW = dict(
+    version=1,  # Controls size (1 is smallest, auto-adjusts)
+    error_correction=qrcode.constants.ERROR_CORRECT_L,
+    box_size=10,  # Size of each box in pixels
+    border=4,  # Border size in boxes
+    image_factory=PilImage,  # Skip per-call image factory resolution
+)
+
+# Display instructions for the /me QR code, by role
+QR_INSTRUCTIONS = {
+    "Customer": "Show this QR code to your trainer to record training sessions.",
+    "Trainer": "This is your trainer QR code for identification purposes.",
+}
+DEFAULT_QR_INSTRUCTIONS = "This is your unique QR code for system identification."
+
+# CPU-bound PNG rendering gets its own small pool so it can't starve the DB threadpool
+_qr_render_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="qr-render")
+
+@lru_cache(maxsize=4096)
+def _render_png(token: str) -> bytes:
+    """Render the QR code PNG for a token (tokens are permanent, so results are cached)"""
+    qr = qrcode.QRCode(**_QR_KW)
+
+    # Add the token data to the QR code; fit stays on since tokens need more than version 1
+    qr.add_data(token)
+    qr.make(fit=True)
+
+    # Create an image from the QR code and encode it as PNG
+    img = qr.make_image(fill_color="black", back_color="white")
+    img_buffer = BytesIO()
+    img.save(img_buffer, format="PNG")
+    return img_buffer.getvalue()
+
 @router.get("/me", response_model=QRCodeDisplayResponse)
-async def get_my_qr_code(
+def get_my_qr_code(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -52,37 +93,28 @@ async def get_my_qr_code(
     If user doesn't have a QR code, one is automatically created.
     """
     # Get or create QR code for user
-    qr_code = qr_code_crud.get_by_user(db, user_id=current_user.id)
-    
-    if not qr_code:
-        # Auto-create QR code if it doesn't exist
-        qr_code = qr_code_crud.create_for_user(db, user_id=current_user.id)
+    qr_code = qr_code_crud.get_or_create_for_user(db, user_id=current_user.id)
     
     # Determine user display name
     user_name = current_user.full_name
     
     # Generate instructions based on user role
-    instructions = ""
-    if current_user.has_role("Customer"):
-        instructions = "Show this QR code to your trainer to record training sessions."
-    elif current_user.has_role("Trainer"):
-        instructions = "This is your trainer QR code for identification purposes."
-    else:
-        instructions = "This is your unique QR code for system identification."
+    instructions = QR_INSTRUCTIONS.get(current_user.role_name, DEFAULT_QR_INSTRUCTIONS)
     
     # Generate QR code image URL
     qr_url = f"/api/v1/qr-codes/image/{qr_code.token}"
 
-    return {
+    # Trusted values go straight to orjson; response_model still documents the shape
+    return UTCORJSONResponse(content={
         "token": qr_code.token,
         "qr_url": qr_url,
         "user_name": user_name,
-        "created_at": qr_code.created_at.isoformat(),
+        "created_at": qr_code.created_at,
         "instructions": instructions
-    }
+    })
 
 @router.post("/scan", response_model=ScanQRCodeResponse)
-async def scan_qr_code(
+def scan_qr_code(
     scan_request: ScanQRCodeRequest,
     current_user: User = Depends(require_trainer_or_admin),
     db: Session = Depends(get_db)
@@ -99,79 +131,77 @@ async def scan_qr_code(
     """
     scan_time = datetime.utcnow()
     
-    # Validate the QR code token
-    qr_code = qr_code_crud.get_by_token(db, token=scan_request.token)
+    # Validate the QR code token; the owner's details are cached per token for a short TTL
+    subject = qr_code_crud.get_scan_subject(db, token=scan_request.token)
     
-    if not qr_code:
+    if not subject:
         return {
             "valid": False,
             "user_id": None,
             "user_name": None,
             "user_role": None,
             "message": "Invalid QR code",
-            "scanned_at": scan_time.isoformat()
+            "scanned_at": scan_time
         }
     
     # Get the user associated with the QR code
-    user = qr_code.user
-    if not user:
+    if not subject["user_id"]:
         return {
             "valid": False,
             "user_id": None,
             "user_name": None,
             "user_role": None,
             "message": "QR code user not found",
-            "scanned_at": scan_time.isoformat()
+            "scanned_at": scan_time
         }
     
     # Check if user is active
-    if not user_crud.is_active(user):
+    if not subject["active"]:
         return {
             "valid": False,
-            "user_id": str(user.id),
-            "user_name": user.full_name,
-            "user_role": user.role_name,
+            "user_id": subject["user_id"],
+            "user_name": subject["user_name"],
+            "user_role": subject["user_role"],
             "message": "User account is inactive",
-            "scanned_at": scan_time.isoformat()
+            "scanned_at": scan_time
         }
     
     # Additional validation for trainer scanning customer codes
-    if current_user.has_role("Trainer") and user.has_role("Customer"):
+    if current_user.role_name == "Trainer" and subject["user_role"] == "Customer":
         # Check if this trainer is assigned to this customer
-        from app.crud.customer import customer_crud
-        customer = customer_crud.get_by_user_id(db, user_id=user.id)
+        trainer_id = subject["trainer_id"]
         
-        if customer and customer.trainer_id and customer.trainer_id != current_user.id:
+        if trainer_id and trainer_id != str(current_user.id):
             # Customer has a different trainer assigned
-            assigned_trainer = user_crud.get(db, id=customer.trainer_id)
-            trainer_name = assigned_trainer.full_name if assigned_trainer else "Unknown"
+            trainer_name = subject["trainer_name"] or "Unknown"
             
             return {
                 "valid": True,  # QR code is valid, but there's a warning
-                "user_id": str(user.id),
-                "user_name": user.full_name,
-                "user_role": user.role_name,
+                "user_id": subject["user_id"],
+                "user_name": subject["user_name"],
+                "user_role": subject["user_role"],
                 "message": f"Warning: This customer is assigned to trainer {trainer_name}",
-                "scanned_at": scan_time.isoformat()
+                "scanned_at": scan_time
             }
     
-    success_message = f"Valid QR code for {user.role_name.lower()} {user.full_name}"
+    success_message = f"Valid QR code for {subject['user_role'].lower()} {subject['user_name']}"
     
     # TODO: Record session tracking entry here when session tracking is implemented
     # This would create a new SessionTracking record linking the trainer and customer
     
     return {
         "valid": True,
-        "user_id": str(user.id),
-        "user_name": user.full_name,
-        "user_role": user.role_name,
+        "user_id": subject["user_id"],
+        "user_name": subject["user_name"],
+        "user_role": subject["user_role"],
         "message": success_message,
-        "scanned_at": scan_time.isoformat()
+        "scanned_at": scan_time
     }
 
 @router.get("/image/{token}")
 async def get_qr_code_image(
     token: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -183,8 +213,13 @@ async def get_qr_code_image(
     No authentication required - QR codes are meant to be publicly displayable.
     The token itself provides the security.
     """
+    # The image for a token never changes, so a matching ETag needs no lookup or render
+    etag = f'"{hashlib.blake2b(token.encode(), digest_size=8).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
     # Verify the token exists in database
-    qr_code = qr_code_crud.get_by_token(db, token=token)
+    qr_code = await run_in_threadpool(qr_code_crud.get_by_token, db, token=token)
 
     if not qr_code:
         raise HTTPException(
@@ -192,33 +227,17 @@ async def get_qr_code_image(
             detail="QR code not found"
         )
 
-    # Generate QR code image
-    qr = qrcode.QRCode(
-        version=1,  # Controls size (1 is smallest, auto-adjusts)
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,  # Size of each box in pixels
-        border=4,  # Border size in boxes
-    )
-
-    # Add the token data to the QR code
-    qr.add_data(token)
-    qr.make(fit=True)
-
-    # Create an image from the QR code
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    # Convert PIL image to bytes
-    img_buffer = BytesIO()
-    img.save(img_buffer, format="PNG")
-    img_buffer.seek(0)
+    # Render on the dedicated executor; repeat scans of the same token hit the cache
+    loop = asyncio.get_running_loop()
+    png = await loop.run_in_executor(_qr_render_executor, _render_png, token)
 
-    # Return as streaming response
-    return StreamingResponse(
-        img_buffer,
+    return Response(
+        content=png,
         media_type="image/png",
         headers={
             "Content-Disposition": f"inline; filename=qrcode_{token[:8]}.png",
-            "Cache-Control": "public, max-age=86400"  # Cache for 24 hours
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": etag
         }
     )
 
@@ -236,7 +255,7 @@ class GenerateQRCodeResponse(BaseModel):
     created: bool  # True if newly created, False if already existed
 
 @router.post("/generate", response_model=GenerateQRCodeResponse)
-async def generate_qr_code_for_user(
+def generate_qr_code_for_user(
     request: GenerateQRCodeRequest,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -1,23 +1,62 @@
-from datetime import date, datetime
-from typing import List, Optional
+from datetime import date
+from typing import List, NamedTuple, NoReturn, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.core.auth import get_current_active_user, require_admin, require_trainer_or_admin
 from app.core.database import get_db
+from app.core.streaming import stream_json_array
 from app.crud.session_volume import session_volume_crud
 from app.crud.user import user_crud
+from app.models.session_volume import SessionVolume
 from app.models.user import User
 from app.schemas.session_volume import (
     SessionVolumeResponse, SessionVolumeCreate, SessionVolumeUpdate,
-    SessionVolumeStatusUpdate
+    SessionVolumeStatusUpdate, session_volume_response_row
 )
 
 router = APIRouter()
 
+# Volume status state machine
+LOCKED_FOR_UPDATE = frozenset({"submitted", "read", "approved"})
+LOCKED_FOR_DELETE = frozenset({"approved"})
+ALLOWED_FROM = {
+    "submit": frozenset({"draft"}),
+    "approve": frozenset({"submitted", "read"}),
+    "reject": frozenset({"submitted", "read"}),
+    "reopen": frozenset({"rejected"}),
+}
+
+class VolumeScope(NamedTuple):
+    """Trainer/customer filters forced by the caller's role; None leaves the filter to the caller"""
+    trainer_id: Optional[UUID]
+    customer_id: Optional[UUID]
+
+async def volume_scope(current_user: User = Depends(get_current_active_user)) -> VolumeScope:
+    """
+    Role-based scope for listing volumes.
+    
+    - Admins can see all volumes with any filters
+    - Trainers can only see their own volumes
+    - Customers can only see volumes where they're the customer
+    """
+    # async: pure computation, no need for a threadpool hop
+    role = current_user.role_name
+    if role == "Admin":
+        return VolumeScope(trainer_id=None, customer_id=None)
+    if role == "Trainer":
+        return VolumeScope(trainer_id=current_user.id, customer_id=None)
+    if role == "Customer":
+        return VolumeScope(trainer_id=None, customer_id=current_user.id)
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Not enough permissions to view session volumes"
+    )
+
 class StatusChangeResponse(BaseModel):
     """Schema for status change responses"""
     success: bool
@@ -26,7 +65,7 @@ class StatusChangeResponse(BaseModel):
     updated_at: str
 
 @router.get("", response_model=List[SessionVolumeResponse])
-async def list_session_volumes(
+def list_session_volumes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     trainer_id: Optional[UUID] = Query(None),
@@ -34,8 +73,7 @@ async def list_session_volumes(
     status: Optional[str] = Query(None),
     start_period: Optional[date] = Query(None),
     end_period: Optional[date] = Query(None),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    scope: VolumeScope = Depends(volume_scope)
 ):
     """
     List session volumes with optional filters.
@@ -45,23 +83,10 @@ async def list_session_volumes(
     - Admins can see all volumes
     """
     # Apply role-based filtering
-    if current_user.has_role("Admin"):
-        # Admins can see all volumes with any filters
-        pass
-    elif current_user.has_role("Trainer"):
-        # Trainers can only see their own volumes
-        trainer_id = current_user.id
-    elif current_user.has_role("Customer"):
-        # Customers can only see volumes where they're the customer
-        customer_id = current_user.id
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to view session volumes"
-        )
+    trainer_id = scope.trainer_id or trainer_id
+    customer_id = scope.customer_id or customer_id
     
-    return session_volume_crud.get_filtered(
-        db,
+    return stream_json_array(session_volume_crud.filtered_statement(
         skip=skip,
         limit=limit,
         trainer_id=trainer_id,
@@ -69,10 +94,10 @@ async def list_session_volumes(
         status=status,
         start_period=start_period,
         end_period=end_period
-    )
+    ), session_volume_response_row)
 
 @router.post("", response_model=SessionVolumeResponse)
-async def create_session_volume(
+def create_session_volume(
     volume_data: SessionVolumeCreate,
     current_user: User = Depends(require_trainer_or_admin),
     db: Session = Depends(get_db)
@@ -83,7 +108,7 @@ async def create_session_volume(
     Trainers can only create volumes for themselves.
     """
     # Trainers can only create volumes for themselves
-    if current_user.has_role("Trainer") and not current_user.has_role("Admin"):
+    if current_user.role_name == "Trainer":
         volume_data.trainer_id = current_user.id
     
     # Validate trainer exists and is active
@@ -114,27 +139,18 @@ async def create_session_volume(
             detail="User is not a customer"
         )
     
-    # Check for existing volume for same trainer-customer-period
-    from sqlalchemy import and_
-    existing = db.query(session_volume_crud.model).filter(
-        and_(
-            session_volume_crud.model.trainer_id == volume_data.trainer_id,
-            session_volume_crud.model.customer_id == volume_data.customer_id,
-            session_volume_crud.model.period == volume_data.period,
-            session_volume_crud.model.deleted_at.is_(None)
-        )
-    ).first()
-
-    if existing:
+    # One live volume per trainer-customer-period is enforced by uq_session_volumes_trainer_customer_period
+    try:
+        return session_volume_crud.create(db, obj_in=volume_data)
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Session volume already exists for this trainer-customer-period"
         )
 
-    return session_volume_crud.create(db, obj_in=volume_data)
-
 @router.get("/{volume_id}", response_model=SessionVolumeResponse)
-async def get_session_volume(
+def get_session_volume(
     volume_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -162,7 +178,7 @@ async def get_session_volume(
     return volume
 
 @router.put("/{volume_id}", response_model=SessionVolumeResponse)
-async def update_session_volume(
+def update_session_volume(
     volume_id: UUID,
     volume_update: SessionVolumeUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -173,31 +189,28 @@ async def update_session_volume(
     Only the trainer who created it or admins can update.
     Cannot update submitted/approved volumes.
     """
-    volume = session_volume_crud.get(db, id=volume_id)
+    volume = session_volume_crud.update_unless_status(
+        db,
+        id=volume_id,
+        obj_in=volume_update,
+        locked_statuses=LOCKED_FOR_UPDATE,
+        trainer_id=None if current_user.role_name == "Admin" else current_user.id
+    )
     if not volume:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session volume not found"
-        )
-    
-    # Permission check
-    if not (current_user.has_role("Admin") or current_user.id == volume.trainer_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only the trainer who created this volume or admins can update it"
+        _raise_status_change_error(
+            db, volume_id, current_user,
+            owner_field="trainer_id",
+            forbidden_detail="Only the trainer who created this volume or admins can update it",
+            status_detail="Cannot update volume with status '{status}'. Only draft or rejected volumes can be updated."
         )
     
-    # Cannot update submitted or approved volumes
-    if volume.status in ["submitted", "read", "approved"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot update volume with status '{volume.status}'. Only draft or rejected volumes can be updated."
-        )
-    
-    return session_volume_crud.update(db, db_obj=volume, obj_in=volume_update)
+    # Serialize before commit expires the RETURNING row
+    response = SessionVolumeResponse.model_validate(volume)
+    db.commit()
+    return response
 
 @router.delete("/{volume_id}")
-async def delete_session_volume(
+def delete_session_volume(
     volume_id: UUID,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -207,27 +220,61 @@ async def delete_session_volume(
     Admin only - soft delete to maintain audit trail.
     Cannot delete approved volumes.
     """
+    # Soft delete the volume unless it is approved
+    if not session_volume_crud.soft_delete_unless_status(db, id=volume_id, locked_statuses=LOCKED_FOR_DELETE):
+        _raise_status_change_error(
+            db, volume_id, current_user,
+            owner_field="trainer_id",
+            forbidden_detail="Not enough permissions",
+            status_detail="Cannot delete approved session volumes"
+        )
+    db.commit()
+    
+    return {"message": "Session volume deleted successfully"}
+
+def _status_change_response(db: Session, volume: SessionVolume, message: str) -> dict:
+    """Build the status change response from the RETURNING row, then commit"""
+    # Read before commit expires the instance, so no refresh SELECT is needed
+    response = {
+        "success": True,
+        "message": message,
+        "new_status": volume.status,
+        "updated_at": volume.updated_at.isoformat()
+    }
+    db.commit()
+    return response
+
+def _raise_status_change_error(
+    db: Session,
+    volume_id: UUID,
+    current_user: User,
+    *,
+    owner_field: str,
+    forbidden_detail: str,
+    status_detail: str
+) -> NoReturn:
+    """Work out why a guarded volume write matched no row and raise the matching error"""
+    db.rollback()
     volume = session_volume_crud.get(db, id=volume_id)
-    if not volume:
+    if not volume or volume.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session volume not found"
         )
     
-    # Cannot delete approved volumes
-    if volume.status == "approved":
+    if current_user.role_name != "Admin" and getattr(volume, owner_field) != current_user.id:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete approved session volumes"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=forbidden_detail
         )
     
-    # Soft delete the volume
-    session_volume_crud.soft_delete(db, db_obj=volume)
-    
-    return {"message": "Session volume deleted successfully"}
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=status_detail.format(status=volume.status)
+    )
 
 @router.post("/{volume_id}/submit", response_model=StatusChangeResponse)
-async def submit_session_volume(
+def submit_session_volume(
     volume_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -236,42 +283,26 @@ async def submit_session_volume(
     Submit a session volume to customer for review.
     Only the trainer who created it can submit.
     """
-    volume = session_volume_crud.get(db, id=volume_id)
-    if not volume:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session volume not found"
-        )
-    
-    # Permission check
-    if not (current_user.has_role("Admin") or current_user.id == volume.trainer_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only the trainer who created this volume can submit it"
-        )
-    
     # Can only submit draft volumes
-    if volume.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot submit volume with status '{volume.status}'. Only draft volumes can be submitted."
+    volume = session_volume_crud.transition_status(
+        db,
+        id=volume_id,
+        from_statuses=ALLOWED_FROM["submit"],
+        to_status="submitted",
+        trainer_id=None if current_user.role_name == "Admin" else current_user.id
+    )
+    if not volume:
+        _raise_status_change_error(
+            db, volume_id, current_user,
+            owner_field="trainer_id",
+            forbidden_detail="Only the trainer who created this volume can submit it",
+            status_detail="Cannot submit volume with status '{status}'. Only draft volumes can be submitted."
         )
     
-    # Submit the volume
-    volume.submit()
-    db.add(volume)
-    db.commit()
-    db.refresh(volume)
-    
-    return {
-        "success": True,
-        "message": "Session volume submitted to customer for review",
-        "new_status": volume.status,
-        "updated_at": volume.updated_at.isoformat()
-    }
+    return _status_change_response(db, volume, "Session volume submitted to customer for review")
 
 @router.post("/{volume_id}/approve", response_model=StatusChangeResponse)
-async def approve_session_volume(
+def approve_session_volume(
     volume_id: UUID,
     approval_data: Optional[SessionVolumeStatusUpdate] = None,
     current_user: User = Depends(get_current_active_user),
@@ -281,53 +312,29 @@ async def approve_session_volume(
     Customer approves a submitted session volume.
     Only the customer can approve their own volumes.
     """
-    volume = session_volume_crud.get(db, id=volume_id)
+    # Can only approve submitted or read volumes; submitted ones skip straight past read
+    volume = session_volume_crud.transition_status(
+        db,
+        id=volume_id,
+        from_statuses=ALLOWED_FROM["approve"],
+        to_status="approved",
+        customer_id=None if current_user.role_name == "Admin" else current_user.id,
+        # Add approval notes if provided
+        note_title="Customer Approval",
+        note=approval_data.notes if approval_data else None
+    )
     if not volume:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session volume not found"
-        )
-    
-    # Permission check - only the customer can approve
-    if not (current_user.has_role("Admin") or current_user.id == volume.customer_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only the customer can approve their session volume"
-        )
-    
-    # Can only approve submitted or read volumes
-    if volume.status not in ["submitted", "read"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot approve volume with status '{volume.status}'. Only submitted or read volumes can be approved."
+        _raise_status_change_error(
+            db, volume_id, current_user,
+            owner_field="customer_id",
+            forbidden_detail="Only the customer can approve their session volume",
+            status_detail="Cannot approve volume with status '{status}'. Only submitted or read volumes can be approved."
         )
     
-    # Mark as read first if it was just submitted
-    if volume.status == "submitted":
-        volume.mark_as_read()
-    
-    # Approve the volume
-    volume.approve()
-    
-    # Add approval notes if provided
-    if approval_data and approval_data.notes:
-        current_notes = volume.notes or ""
-        approval_note = f"\n--- Customer Approval ({datetime.utcnow().date()}) ---\n{approval_data.notes}"
-        volume.notes = current_notes + approval_note
-    
-    db.add(volume)
-    db.commit()
-    db.refresh(volume)
-    
-    return {
-        "success": True,
-        "message": "Session volume approved successfully",
-        "new_status": volume.status,
-        "updated_at": volume.updated_at.isoformat()
-    }
+    return _status_change_response(db, volume, "Session volume approved successfully")
 
 @router.post("/{volume_id}/reject", response_model=StatusChangeResponse)
-async def reject_session_volume(
+def reject_session_volume(
     volume_id: UUID,
     rejection_data: SessionVolumeStatusUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -338,27 +345,6 @@ async def reject_session_volume(
     Only the customer can reject their own volumes.
     Rejection reason is required.
     """
-    volume = session_volume_crud.get(db, id=volume_id)
-    if not volume:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session volume not found"
-        )
-    
-    # Permission check - only the customer can reject
-    if not (current_user.has_role("Admin") or current_user.id == volume.customer_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only the customer can reject their session volume"
-        )
-    
-    # Can only reject submitted or read volumes
-    if volume.status not in ["submitted", "read"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot reject volume with status '{volume.status}'. Only submitted or read volumes can be rejected."
-        )
-    
     # Rejection reason is required
     if not rejection_data.notes:
         raise HTTPException(
@@ -366,31 +352,28 @@ async def reject_session_volume(
             detail="Rejection reason is required"
         )
     
-    # Mark as read first if it was just submitted
-    if volume.status == "submitted":
-        volume.mark_as_read()
-    
-    # Reject the volume
-    volume.reject()
-    
-    # Add rejection notes
-    current_notes = volume.notes or ""
-    rejection_note = f"\n--- Customer Rejection ({datetime.utcnow().date()}) ---\n{rejection_data.notes}"
-    volume.notes = current_notes + rejection_note
-    
-    db.add(volume)
-    db.commit()
-    db.refresh(volume)
+    # Can only reject submitted or read volumes
+    volume = session_volume_crud.transition_status(
+        db,
+        id=volume_id,
+        from_statuses=ALLOWED_FROM["reject"],
+        to_status="rejected",
+        customer_id=None if current_user.role_name == "Admin" else current_user.id,
+        note_title="Customer Rejection",
+        note=rejection_data.notes
+    )
+    if not volume:
+        _raise_status_change_error(
+            db, volume_id, current_user,
+            owner_field="customer_id",
+            forbidden_detail="Only the customer can reject their session volume",
+            status_detail="Cannot reject volume with status '{status}'. Only submitted or read volumes can be rejected."
+        )
     
-    return {
-        "success": True,
-        "message": "Session volume rejected",
-        "new_status": volume.status,
-        "updated_at": volume.updated_at.isoformat()
-    }
+    return _status_change_response(db, volume, "Session volume rejected")
 
 @router.post("/{volume_id}/reopen", response_model=StatusChangeResponse)
-async def reopen_session_volume(
+def reopen_session_volume(
     volume_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -399,53 +382,33 @@ async def reopen_session_volume(
     Reopen a rejected session volume back to draft status.
     Only the trainer who created it can reopen.
     """
-    volume = session_volume_crud.get(db, id=volume_id)
-    if not volume:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session volume not found"
-        )
-    
-    # Permission check
-    if not (current_user.has_role("Admin") or current_user.id == volume.trainer_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only the trainer who created this volume can reopen it"
-        )
-    
     # Can only reopen rejected volumes
-    if volume.status != "rejected":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot reopen volume with status '{volume.status}'. Only rejected volumes can be reopened."
+    volume = session_volume_crud.transition_status(
+        db,
+        id=volume_id,
+        from_statuses=ALLOWED_FROM["reopen"],
+        to_status="draft",
+        trainer_id=None if current_user.role_name == "Admin" else current_user.id,
+        note_title="Volume Reopened",
+        note="Volume reopened for revision."
+    )
+    if not volume:
+        _raise_status_change_error(
+            db, volume_id, current_user,
+            owner_field="trainer_id",
+            forbidden_detail="Only the trainer who created this volume can reopen it",
+            status_detail="Cannot reopen volume with status '{status}'. Only rejected volumes can be reopened."
         )
     
-    # Reopen the volume
-    volume.reopen()
-    
-    # Add reopen note
-    current_notes = volume.notes or ""
-    reopen_note = f"\n--- Volume Reopened ({datetime.utcnow().date()}) ---\nVolume reopened for revision."
-    volume.notes = current_notes + reopen_note
-    
-    db.add(volume)
-    db.commit()
-    db.refresh(volume)
-    
-    return {
-        "success": True,
-        "message": "Session volume reopened for editing",
-        "new_status": volume.status,
-        "updated_at": volume.updated_at.isoformat()
-    }
+    return _status_change_response(db, volume, "Session volume reopened for editing")
 
 @router.get("/period/{year}/{month}", response_model=List[SessionVolumeResponse])
-async def get_volumes_by_period(
+def get_volumes_by_period(
     year: int,
     month: int,
     trainer_id: Optional[UUID] = Query(None),
     customer_id: Optional[UUID] = Query(None),
-    current_user: User = Depends(get_current_active_user),
+    scope: VolumeScope = Depends(volume_scope),
     db: Session = Depends(get_db)
 ):
     """
@@ -478,20 +441,8 @@ async def get_volumes_by_period(
         )
     
     # Apply role-based filtering
-    if current_user.has_role("Admin"):
-        # Admins can see all volumes with any filters
-        pass
-    elif current_user.has_role("Trainer"):
-        # Trainers can only see their own volumes
-        trainer_id = current_user.id
-    elif current_user.has_role("Customer"):
-        # Customers can only see volumes where they're the customer
-        customer_id = current_user.id
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to view session volumes"
-        )
+    trainer_id = scope.trainer_id or trainer_id
+    customer_id = scope.customer_id or customer_id
     
     return session_volume_crud.get_by_period(
         db,
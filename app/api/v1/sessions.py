@@ -4,20 +4,19 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func, desc
+from sqlalchemy import func, desc
 from pydantic import BaseModel
 
 from app.core.auth import get_current_active_user, require_admin, require_trainer_or_admin
 from app.core.database import get_db
+from app.core.streaming import stream_json_array
 from app.crud.session_tracking import session_tracking_crud
 from app.crud.session_volume import session_volume_crud
 from app.crud.qr_code import qr_code_crud
-from app.crud.user import user_crud
 from app.models.user import User
-from app.models.session_tracking import SessionTracking
 from app.schemas.session_tracking import (
-    SessionTrackingResponse, SessionTrackingCreate, SessionTrackingUpdate,
-    SessionTrackingStats
+    SessionTrackingResponse, SessionTrackingUpdate,
+    SessionTrackingStats, session_tracking_response_row
 )
 
 router = APIRouter()
@@ -38,7 +37,7 @@ class TrackSessionResponse(BaseModel):
     total_sessions_this_month: int
 
 @router.post("/track", response_model=TrackSessionResponse)
-async def track_session(
+def track_session(
     track_request: TrackSessionRequest,
     current_user: User = Depends(require_trainer_or_admin),
     db: Session = Depends(get_db)
@@ -53,95 +52,85 @@ async def track_session(
     """
     session_date = track_request.session_date or date.today()
     
-    # Validate QR code
-    qr_code = qr_code_crud.get_by_token(db, token=track_request.qr_token)
-    if not qr_code:
+    # Validate QR code; the owner's details are cached per token for a short TTL
+    subject = qr_code_crud.get_scan_subject(db, token=track_request.qr_token)
+    if not subject:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invalid QR code"
         )
     
-    customer = qr_code.user
-    if not customer or not user_crud.is_active(customer):
+    if not subject["user_id"] or not subject["active"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Customer not found or inactive"
         )
+    customer_name = subject["user_name"]
     
-    # Check for existing session on the same date
-    existing_session = db.query(SessionTracking).filter(
-        and_(
-            SessionTracking.trainer_id == current_user.id,
-            SessionTracking.qr_code_id == qr_code.id,
-            SessionTracking.session_date == session_date
-        )
-    ).first()
-    
-    if existing_session:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Session already recorded for {customer.full_name} on {session_date}"
-        )
-    
-    # Get or create monthly session volume
+    # The volume upsert-and-increment and the tracking insert commit together
     period = session_date.replace(day=1)  # First day of month
-    session_volume = session_volume_crud.get_or_create_for_period(
+    session_volume = session_volume_crud.add_session_for_period(
         db, 
         trainer_id=current_user.id,
-        customer_id=customer.id,
+        customer_id=UUID(subject["user_id"]),
         period=period
     )
+    session_volume_id = session_volume.id
+    total_sessions = session_volume.session_count
     
-    # Create session tracking record
-    session_data = SessionTrackingCreate(
+    # One scan per trainer-customer-day is enforced by uq_session_tracking_trainer_qr_date;
+    # a duplicate inserts nothing, and the rollback undoes the volume increment
+    session_record = session_tracking_crud.create_scan(
+        db,
         trainer_id=current_user.id,
-        qr_code_id=qr_code.id,
-        session_volume_id=session_volume.id,
+        qr_code_id=UUID(subject["qr_code_id"]),
+        session_volume_id=session_volume_id,
         session_date=session_date
     )
-    
-    session_record = session_tracking_crud.create(db, obj_in=session_data)
-    
-    # Update session volume count
-    session_volume_crud.increment_session_count(db, session_volume_id=session_volume.id)
+    if session_record is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Session already recorded for {customer_name} on {session_date}"
+        )
+    session_id = session_record.id
+    db.commit()
     
     return {
         "success": True,
-        "session_id": session_record.id,
-        "message": f"Session recorded for {customer.full_name}",
-        "customer_name": customer.full_name,
+        "session_id": session_id,
+        "message": f"Session recorded for {customer_name}",
+        "customer_name": customer_name,
         "session_date": session_date,
-        "monthly_volume_id": session_volume.id,
-        "total_sessions_this_month": session_volume.session_count + 1
+        "monthly_volume_id": session_volume_id,
+        "total_sessions_this_month": total_sessions
     }
 
 @router.get("", response_model=List[SessionTrackingResponse])
-async def list_sessions(
+def list_sessions(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     trainer_id: Optional[UUID] = Query(None),
     customer_id: Optional[UUID] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_admin)
 ):
     """
     List all session tracking records with optional filters.
     Admin only - for oversight and reporting.
     """
-    return session_tracking_crud.get_filtered(
-        db,
+    return stream_json_array(session_tracking_crud.filtered_statement(
         skip=skip,
         limit=limit,
         trainer_id=trainer_id,
         customer_id=customer_id,
         start_date=start_date,
         end_date=end_date
-    )
+    ), session_tracking_response_row)
 
 @router.get("/{session_id}", response_model=SessionTrackingResponse)
-async def get_session(
+def get_session(
     session_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -158,10 +147,9 @@ async def get_session(
         )
     
     # Permission check - users can see sessions they're involved in
-    customer = session_record.qr_code.user
     if not (current_user.has_role("Admin") or 
             current_user.id == session_record.trainer_id or 
-            current_user.id == customer.id):
+            current_user.id == session_record.qr_code.user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this session"
@@ -170,7 +158,7 @@ async def get_session(
     return session_record
 
 @router.put("/{session_id}", response_model=SessionTrackingResponse)
-async def update_session(
+def update_session(
     session_id: UUID,
     session_update: SessionTrackingUpdate,
     current_user: User = Depends(require_admin),
@@ -190,7 +178,7 @@ async def update_session(
     return session_tracking_crud.update(db, db_obj=session_record, obj_in=session_update)
 
 @router.delete("/{session_id}")
-async def delete_session(
+def delete_session(
     session_id: UUID,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -216,14 +204,13 @@ async def delete_session(
     return {"message": "Session deleted successfully"}
 
 @router.get("/customer/{customer_id}", response_model=List[SessionTrackingResponse])
-async def get_customer_sessions(
+def get_customer_sessions(
     customer_id: UUID,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user)
 ):
     """
     Get all sessions for a specific customer.
@@ -232,32 +219,31 @@ async def get_customer_sessions(
     - Admins can see all customer sessions
     """
     # Permission check
-    if not current_user.has_role("Admin"):
-        if current_user.id != customer_id and current_user.has_role("Customer"):
+    role = current_user.role_name
+    if role != "Admin":
+        if current_user.id != customer_id and role == "Customer":
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Can only view your own sessions"
             )
     
-    return session_tracking_crud.get_by_customer(
-        db,
+    return stream_json_array(session_tracking_crud.filtered_statement(
         customer_id=customer_id,
-        trainer_id=current_user.id if current_user.has_role("Trainer") else None,
+        trainer_id=current_user.id if role == "Trainer" else None,
         skip=skip,
         limit=limit,
         start_date=start_date,
         end_date=end_date
-    )
+    ), session_tracking_response_row)
 
 @router.get("/trainer/{trainer_id}", response_model=List[SessionTrackingResponse])
-async def get_trainer_sessions(
+def get_trainer_sessions(
     trainer_id: UUID,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user)
 ):
     """
     Get all sessions conducted by a specific trainer.
@@ -271,17 +257,16 @@ async def get_trainer_sessions(
             detail="Can only view your own sessions"
         )
     
-    return session_tracking_crud.get_by_trainer(
-        db,
+    return stream_json_array(session_tracking_crud.filtered_statement(
         trainer_id=trainer_id,
         skip=skip,
         limit=limit,
         start_date=start_date,
         end_date=end_date
-    )
+    ), session_tracking_response_row)
 
 @router.get("/stats", response_model=SessionTrackingStats)
-async def get_session_stats(
+def get_session_stats(
     trainer_id: Optional[UUID] = Query(None),
     customer_id: Optional[UUID] = Query(None),
     start_date: Optional[date] = Query(None),
@@ -296,9 +281,10 @@ async def get_session_stats(
     - Admins can see all stats with filters
     """
     # Apply permission-based filters
-    if current_user.has_role("Trainer") and not current_user.has_role("Admin"):
+    role = current_user.role_name
+    if role == "Trainer":
         trainer_id = current_user.id
-    elif current_user.has_role("Customer") and not current_user.has_role("Admin"):
+    elif role == "Customer":
         customer_id = current_user.id
     
     return session_tracking_crud.get_stats(
@@ -1,12 +1,14 @@
-from typing import List
+from typing import List, NoReturn, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.core.auth import get_current_active_user, require_trainer_or_admin
 from app.core.database import get_db
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
 from app.crud.trainer import trainer_crud
 from app.crud.customer import customer_crud
 from app.crud.user import user_crud
@@ -33,9 +35,10 @@ class TrainerStatsResponse(BaseModel):
     sessions_this_month: int
     
 @router.get("/", response_model=List[TrainerListResponse])
-async def list_trainers(
-    skip: int = 0,
-    limit: int = 100,
+def list_trainers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[UUID] = Query(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -43,11 +46,14 @@ async def list_trainers(
     List all active trainers.
     Anyone can view the trainer list.
     """
-    trainers = trainer_crud.get_active(db, skip=skip, limit=limit)
-    return trainers
+    # Already serialized (and cached), so skip response_model validation
+    trainers = trainer_crud.get_active_cached(db, skip=skip, limit=limit, after_id=after_id)
+    response = ORJSONResponse(trainers)
+    set_next_cursor(response, [trainer["user_id"] for trainer in trainers], limit)
+    return response
 
 @router.get("/{trainer_id}", response_model=TrainerResponse)
-async def get_trainer_details(
+def get_trainer_details(
     trainer_id: UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -56,7 +62,7 @@ async def get_trainer_details(
     Get detailed information about a specific trainer.
     Anyone can view trainer details.
     """
-    trainer = trainer_crud.get_by_user_id(db, user_id=trainer_id)
+    trainer = trainer_crud.get_details_cached(db, user_id=trainer_id)
     
     if not trainer:
         raise HTTPException(
@@ -64,13 +70,16 @@ async def get_trainer_details(
             detail="Trainer not found"
         )
     
-    return trainer
+    # Already serialized (and cached), so skip response_model validation
+    return ORJSONResponse(trainer)
 
 @router.get("/{trainer_id}/customers", response_model=List[CustomerResponse])
-async def get_trainer_customers(
+def get_trainer_customers(
     trainer_id: UUID,
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[UUID] = Query(None),
     current_user: User = Depends(require_trainer_or_admin),
     db: Session = Depends(get_db)
 ):
@@ -94,11 +103,12 @@ async def get_trainer_customers(
             detail="Trainers can only view their own customers"
         )
     
-    customers = trainer_crud.get_customers(db, trainer_id=trainer_id, skip=skip, limit=limit)
+    customers = trainer_crud.get_customers(db, trainer_id=trainer_id, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, [customer.user_id for customer in customers], limit)
     return customers
 
 @router.post("/{trainer_id}/assign-customer")
-async def assign_customer_to_trainer(
+def assign_customer_to_trainer(
     trainer_id: UUID,
     assignment_request: AssignCustomerRequest,
     current_user: User = Depends(require_trainer_or_admin),
@@ -116,7 +126,28 @@ async def assign_customer_to_trainer(
             detail="Only administrators can assign customers to trainers"
         )
     
-    # Check if trainer exists
+    # Assign in one guarded UPDATE; only work out the error when it matches nothing
+    try:
+        assigned = customer_crud.assign_trainer_if_eligible(
+            db,
+            customer_id=assignment_request.customer_id,
+            trainer_id=trainer_id
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to assign customer: {str(e)}"
+        )
+    
+    if not assigned:
+        _raise_assignment_error(db, trainer_id, assignment_request.customer_id)
+    
+    return {"message": f"Customer successfully assigned to trainer"}
+
+def _raise_assignment_error(db: Session, trainer_id: UUID, customer_id: UUID) -> NoReturn:
+    """Work out why a guarded trainer assignment matched no row and raise the matching error"""
+    db.rollback()
+    # Check if trainer exists (trainer user is joined in)
     trainer = trainer_crud.get_by_user_id(db, user_id=trainer_id)
     if not trainer:
         raise HTTPException(
@@ -125,15 +156,14 @@ async def assign_customer_to_trainer(
         )
     
     # Check if trainer user is active
-    trainer_user = user_crud.get(db, id=trainer_id)
-    if not trainer_user or not user_crud.is_active(trainer_user):
+    if not user_crud.is_active(trainer.user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Trainer is not active"
         )
     
-    # Check if customer exists and is active
-    customer_user = user_crud.get(db, id=assignment_request.customer_id)
+    # Check if customer exists and is active (role and customer record are joined in)
+    customer_user = customer_crud.get_user_with_customer(db, user_id=customer_id)
     if not customer_user or not user_crud.is_active(customer_user):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -141,36 +171,26 @@ async def assign_customer_to_trainer(
         )
     
     # Check if customer has Customer role
-    if not customer_user.has_role("Customer"):
+    if customer_user.role_name != "Customer":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is not a customer"
         )
     
-    # Assign customer to trainer
-    try:
-        customer = customer_crud.assign_trainer(
-            db, 
-            customer_id=assignment_request.customer_id, 
-            trainer_id=trainer_id
-        )
-        
-        if not customer:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Customer record not found"
-            )
-            
-        return {"message": f"Customer successfully assigned to trainer"}
-        
-    except Exception as e:
+    if not customer_user.customer:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to assign customer: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Customer record not found"
         )
+    
+    # Every check passes now, so the trainer or customer changed mid-request
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Trainer or customer changed during assignment, please retry"
+    )
 
 @router.delete("/{trainer_id}/remove-customer")
-async def remove_customer_from_trainer(
+def remove_customer_from_trainer(
     trainer_id: UUID,
     removal_request: RemoveCustomerRequest,
     current_user: User = Depends(require_trainer_or_admin),
@@ -187,6 +207,27 @@ async def remove_customer_from_trainer(
             detail="Only administrators can remove customer assignments"
         )
     
+    # Unassign in one guarded UPDATE; only work out the error when it matches nothing
+    try:
+        removed = customer_crud.unassign_trainer_if_trainer_exists(
+            db,
+            customer_id=removal_request.customer_id,
+            trainer_id=trainer_id
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to remove customer: {str(e)}"
+        )
+    
+    if not removed:
+        _raise_removal_error(db, trainer_id, removal_request.customer_id)
+    
+    return {"message": "Customer successfully removed from trainer"}
+
+def _raise_removal_error(db: Session, trainer_id: UUID, customer_id: UUID) -> NoReturn:
+    """Work out why a guarded trainer removal matched no row and raise the matching error"""
+    db.rollback()
     # Check if trainer exists
     trainer = trainer_crud.get_by_user_id(db, user_id=trainer_id)
     if not trainer:
@@ -195,37 +236,21 @@ async def remove_customer_from_trainer(
             detail="Trainer not found"
         )
     
-    # Check if customer exists
-    customer_user = user_crud.get(db, id=removal_request.customer_id)
+    # Check if customer exists (customer record is joined in)
+    customer_user = customer_crud.get_user_with_customer(db, user_id=customer_id)
     if not customer_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Customer not found"
         )
     
-    # Remove customer from trainer
-    try:
-        customer = customer_crud.unassign_trainer(
-            db, 
-            customer_id=removal_request.customer_id
-        )
-        
-        if not customer:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Customer record not found"
-            )
-            
-        return {"message": "Customer successfully removed from trainer"}
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to remove customer: {str(e)}"
-        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Customer record not found"
+    )
 
 @router.get("/me/stats", response_model=TrainerStatsResponse)
-async def get_my_trainer_stats(
+def get_my_trainer_stats(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -248,15 +273,5 @@ async def get_my_trainer_stats(
             detail="Trainer record not found"
         )
     
-    total_customers = customer_crud.count_by_trainer(db, trainer_id=current_user.id)
-    active_customers = total_customers
-    total_sessions = 0
-    sessions_this_month = 0
-    
-    return {
-        "trainer_id": current_user.id,
-        "total_customers": total_customers,
-        "active_customers": active_customers,
-        "total_sessions": total_sessions,
-        "sessions_this_month": sessions_this_month
-    }
\ No newline at end of file
+    stats = trainer_crud.get_stats(db, trainer_id=current_user.id)
+    return {"trainer_id": current_user.id, **stats}
\ No newline at end of file
@@ -1,11 +1,12 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.core.auth import get_current_active_user, require_admin, require_trainer_or_admin
 from app.core.database import get_db
+from app.core.pagination import MAX_PAGE_SIZE, set_next_cursor
 from app.crud.user import user_crud
 from app.models.user import User
 from app.schemas.user import UserResponse, UserCreate, UserUpdate
@@ -20,40 +21,49 @@ async def get_current_user_info(
     return current_user
 
 @router.get("/", response_model=List[UserResponse])
-async def get_users(
-    skip: int = 0,
-    limit: int = 100,
+def get_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[UUID] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Get all users (Admin only)"""
-    users = user_crud.get_active(db, skip=skip, limit=limit)
+    users = user_crud.get_active(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, [user.id for user in users], limit)
     return users
 
 @router.get("/trainers", response_model=List[UserResponse])
-async def get_trainers(
-    skip: int = 0,
-    limit: int = 100,
+def get_trainers(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[UUID] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_trainer_or_admin)
 ):
     """Get all trainers"""
-    trainers = user_crud.get_trainers(db, skip=skip, limit=limit)
+    trainers = user_crud.get_trainers(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, [user.id for user in trainers], limit)
     return trainers
 
 @router.get("/customers", response_model=List[UserResponse])
-async def get_customers(
-    skip: int = 0,
-    limit: int = 100,
+def get_customers(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[UUID] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_trainer_or_admin)
 ):
     """Get all customers"""
-    customers = user_crud.get_customers(db, skip=skip, limit=limit)
+    customers = user_crud.get_customers(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, [user.id for user in customers], limit)
     return customers
 
 @router.post("/", response_model=UserResponse)
-async def create_user(
+def create_user(
     user_in: UserCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
@@ -70,7 +80,7 @@ async def create_user(
     return user
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(
+def get_user(
     user_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -84,9 +94,7 @@ async def get_user(
         )
     
     # Users can only access their own data unless they're Admin or Trainer
-    if (user_id != current_user.id and 
-        not current_user.has_role("Admin") and 
-        not current_user.has_role("Trainer")):
+    if user_id != current_user.id and not current_user.has_any_role("Admin", "Trainer"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -95,7 +103,7 @@ async def get_user(
     return user
 
 @router.put("/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: UUID,
     user_in: UserUpdate,
     db: Session = Depends(get_db),
@@ -127,7 +135,7 @@ async def update_user(
     return user
 
 @router.delete("/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
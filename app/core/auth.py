@@ -2,11 +2,13 @@ from typing import Optional
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import SessionLocal, get_db
 from app.core.security import decode_access_token
+from app.core.user_cache import authenticated_user_cache
 from app.crud.user import user_crud
 from app.models.user import User
 
@@ -32,16 +34,29 @@ async def get_current_user(
     if user_id_str is None:
         raise credentials_exception
 
-    try:
-        user_id = UUID(user_id_str)
-    except ValueError:
-        raise credentials_exception
+    # Token checks stay on the event loop; only a cache miss parses the id and goes to the threadpool
+    cached_user = authenticated_user_cache.get(user_id_str)
+    if cached_user is None:
+        try:
+            user_id = UUID(user_id_str)
+        except ValueError:
+            raise credentials_exception
+        cached_user = await run_in_threadpool(_load_user_detached, user_id)
+        if cached_user is None:
+            raise credentials_exception
+        authenticated_user_cache.set(cached_user)
 
-    user = user_crud.get(db, id=user_id)
-    if user is None:
-        raise credentials_exception
+    # A per-request copy attached to this request's session, built without a query
+    return db.merge(cached_user, load=False)
 
-    return user
+def _load_user_detached(user_id: UUID) -> Optional[User]:
+    """
+    Load a user (with role and customer record) in a throwaway session so the cached
+    row is never shared with a request; customer self-service endpoints read
+    current_user.customer without another query
+    """
+    with SessionLocal() as db:
+        return user_crud.get_with_customer(db, id=user_id)
 
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
@@ -59,7 +74,8 @@ def require_role(required_role: str):
     async def role_dependency(
         current_user: User = Depends(get_current_active_user)
     ) -> User:
-        if not current_user.has_role(required_role):
+        # Users have a single (joined) role, so this is one string comparison
+        if current_user.role_name != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions"
@@ -77,7 +93,7 @@ async def require_trainer_or_admin(
     current_user: User = Depends(get_current_active_user)
 ) -> User:
     """Require trainer or admin role"""
-    if not (current_user.has_role("Trainer") or current_user.has_role("Admin")):
+    if not current_user.has_any_role("Trainer", "Admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Trainer or Admin access required"
@@ -0,0 +1,39 @@
+import logging
+from typing import Any, Optional
+
+import orjson
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Short timeouts: the cache is an optimisation, a slow or missing Redis must not stall requests
+redis_client = redis.Redis.from_url(
+    settings.REDIS_URL,
+    socket_connect_timeout=0.25,
+    socket_timeout=0.25,
+)
+
+def cache_get(key: str) -> Optional[Any]:
+    """Get a JSON value from the cache, or None on a miss or Redis error"""
+    try:
+        raw = redis_client.get(key)
+    except redis.RedisError as e:
+        logger.debug(f"Cache get failed for {key}: {e}")
+        return None
+    return orjson.loads(raw) if raw is not None else None
+
+def cache_set(key: str, value: Any, ttl_seconds: int) -> None:
+    """Store a JSON value in the cache with an expiry; errors are ignored"""
+    try:
+        redis_client.set(key, orjson.dumps(value), ex=ttl_seconds)
+    except redis.RedisError as e:
+        logger.debug(f"Cache set failed for {key}: {e}")
+
+def cache_delete(*keys: str) -> None:
+    """Remove keys from the cache; errors are ignored"""
+    try:
+        redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.debug(f"Cache delete failed for {keys}: {e}")
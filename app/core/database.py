@@ -1,8 +1,8 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import ORMExecuteState, sessionmaker, Session, with_loader_criteria
 
 # Import all models to ensure they're registered with Base
-from app.models import Base, User, Customer, Trainer, Role, Profile, SessionVolume, SessionTracking, QRCode
+from app.models import Base, SoftDeleteMixin, User, Customer, Trainer, Role, Profile, SessionVolume, SessionTracking, QRCode
 from .config import settings
 
 # Database configuration with connection pool settings
@@ -12,10 +12,28 @@ engine = create_engine(
     max_overflow=settings.DB_MAX_OVERFLOW,
     pool_timeout=settings.DB_POOL_TIMEOUT,
     pool_recycle=settings.DB_POOL_RECYCLE,
-    echo=settings.DEBUG_MODE  # Log SQL queries in debug mode
+    pool_pre_ping=settings.DB_POOL_PRE_PING,  # Replace connections dropped by the server/proxy
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,  # Compiled SQL cache, per engine
+    # JIT planning costs more than it saves on short OLTP queries
+    connect_args={"options": "-c jit=off"},
+    echo=settings.DB_ECHO  # Log SQL queries (opt-in, independent of DEBUG_MODE)
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _hide_soft_deleted(execute_state: ORMExecuteState) -> None:
+    """Filter soft-deleted rows out of every SELECT touching a SoftDeleteMixin model, joins and subqueries included"""
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get("include_deleted", False)
+    ):
+        # Relationship loads issued for these rows inherit the criteria (propagate_to_loaders)
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -24,6 +42,17 @@ def get_db():
     finally:
         db.close()
 
+def warm_pool(size: int = settings.DB_POOL_SIZE) -> None:
+    """Open pool connections up front so the first requests after boot skip the connect handshake"""
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(engine.connect())
+    finally:
+        # Closing hands each connection back to the pool, still open
+        for connection in connections:
+            connection.close()
+
 def create_tables():
     """Create all tables in the database"""
     Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -0,0 +1,14 @@
+from typing import Any, Sequence
+
+from fastapi import Response
+
+# Upper bound for limit on list endpoints that page through users/trainers/customers
+MAX_PAGE_SIZE = 200
+
+# Keyset cursor for the next page: pass it back as after_id (with skip=0)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def set_next_cursor(response: Response, page_ids: Sequence[Any], limit: int) -> None:
+    """Advertise the next page's cursor when this page came back full"""
+    if page_ids and len(page_ids) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(page_ids[-1])
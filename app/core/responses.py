@@ -0,0 +1,13 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+class UTCORJSONResponse(JSONResponse):
+    """
+    orjson response that writes UTC offsets as "Z", matching Pydantic's JSON output,
+    for handlers that skip response_model serialization and return raw rows
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
@@ -1,21 +1,27 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Union
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import bcrypt
+from jose import JWTError, jwk, jwt
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# The signing key is process-constant, so build the jose key object once
+# rather than letting every encode/decode re-construct it from the secret
+_jwt_key = jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
 
 def get_password_hash(password: str) -> str:
     """Generate password hash"""
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode("utf-8")
 
 def create_access_token(
     data: dict, 
@@ -30,13 +36,13 @@ def create_access_token(
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _jwt_key, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT token"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, _jwt_key, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
         return None
@@ -47,20 +53,21 @@ def create_refresh_token(
 ) -> str:
     """Create a JWT refresh token"""
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        expire = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    to_encode.update({"exp": expire, "iat": now, "type": "refresh"})
+    encoded_jwt = jwt.encode(to_encode, _jwt_key, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def verify_refresh_token(token: str) -> Optional[dict]:
     """Verify a refresh token and return its payload"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, _jwt_key, algorithms=[settings.ALGORITHM])
         if payload.get("type") != "refresh":
             return None
         return payload
@@ -81,9 +88,11 @@ def create_tokens_for_user(user_id: UUID, email: str, role: Optional[str] = None
     """Create both access and refresh tokens for a user"""
     access_token = create_token_for_user(user_id, email, role)
 
+    jti = uuid4().hex
     refresh_token_data = {
         "sub": str(user_id),
-        "email": email
+        "email": email,
+        "jti": jti
     }
     refresh_token = create_refresh_token(data=refresh_token_data)
 
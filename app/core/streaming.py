@@ -0,0 +1,58 @@
+from typing import Any, Callable, Dict, Iterator, List
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Executable
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+
+# Rows fetched per round-trip from the server-side cursor
+STREAM_BATCH_SIZE = 100
+
+RowBuilder = Callable[[Any], Dict[str, Any]]
+
+def _serialize_batch(batch: List[Any], build_row: RowBuilder, first: bool) -> bytes:
+    """Serialize a batch of rows as comma-separated JSON, opening the array if first"""
+    # OPT_UTC_Z writes UTC offsets as "Z", matching Pydantic's JSON output
+    rows = b",".join(orjson.dumps(build_row(obj), option=orjson.OPT_UTC_Z) for obj in batch)
+    return (b"[" if first else b",") + rows
+
+def _json_array_rows(
+    db: Session, first_chunk: bytes, batches: Iterator[List[Any]], build_row: RowBuilder
+) -> Iterator[bytes]:
+    """Yield the already serialized first batch, then the remaining batches and the closing bracket"""
+    try:
+        yield first_chunk
+        for batch in batches:
+            yield _serialize_batch(batch, build_row, first=False)
+        yield b"]"
+    finally:
+        db.close()
+
+def stream_json_array(stmt: Executable, build_row: RowBuilder) -> StreamingResponse:
+    """
+    Stream the ORM rows selected by stmt as a JSON array of build_row(obj) dicts.
+
+    The query runs and its first batch is serialized before the response starts,
+    so errors there still surface as a normal 500. Once the body is streaming
+    the status is already sent: a later DB or serialization error aborts the
+    connection, and clients see a truncated body rather than a valid array.
+    """
+    # Yield-dependencies are torn down before a streaming body is sent, so the
+    # request's get_db session is gone by then; the stream owns its session
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt, execution_options={"yield_per": STREAM_BATCH_SIZE})
+        batches = result.scalars().partitions()
+        first_batch = next(batches, None)
+        if first_batch is None:
+            db.close()
+            return StreamingResponse(iter([b"[]"]), media_type="application/json")
+        first_chunk = _serialize_batch(first_batch, build_row, first=True)
+    except Exception:
+        db.close()
+        raise
+    return StreamingResponse(
+        _json_array_rows(db, first_chunk, batches, build_row), media_type="application/json"
+    )
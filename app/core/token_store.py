@@ -0,0 +1,44 @@
+import time
+from typing import Optional
+
+import redis
+
+from app.core.cache import redis_client
+from app.core.config import settings
+
+class RefreshTokenStore:
+    """
+    Redis-backed registry of exchanged refresh tokens, keyed by their jti claim.
+
+    Supports rotation (each refresh token can be exchanged once) and reuse
+    detection (presenting an already-rotated token revokes every refresh token
+    issued to that user up to that point). State is shared by every worker, so
+    a token rotated or revoked in one process is rejected by all of them.
+
+    Unlike the response cache, Redis errors are not swallowed here: callers
+    must refuse the refresh rather than accept a token they can't check.
+    """
+
+    def __init__(self, client: redis.Redis, ttl_seconds: int):
+        self._client = client
+        # Keys only need to outlive the longest-lived refresh token
+        self._ttl = ttl_seconds
+
+    def rotate(self, jti: str) -> bool:
+        """Retire a refresh token; returns False if it had already been exchanged"""
+        return bool(self._client.set(f"refresh-rotated:{jti}", 1, nx=True, ex=self._ttl))
+
+    def revoke_user(self, user_id: str) -> None:
+        """Revoke every refresh token issued to a user so far"""
+        self._client.set(f"refresh-revoked:{user_id}", time.time(), ex=self._ttl)
+
+    def is_revoked(self, user_id: str, issued_at: Optional[int]) -> bool:
+        """Check if a refresh token issued at issued_at has been revoked"""
+        revoked_before = self._client.get(f"refresh-revoked:{user_id}")
+        if revoked_before is None:
+            return False
+        return issued_at is None or issued_at <= float(revoked_before)
+
+refresh_token_store = RefreshTokenStore(
+    redis_client, ttl_seconds=settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+)
@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+from typing import Optional, Union
+from uuid import UUID
+
+import redis
+from cachetools import TTLCache
+
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Redis channel carrying the ids of users whose cached rows are stale
+INVALIDATION_CHANNEL = "auth-user-cache:invalidate"
+
+class AuthenticatedUserCache:
+    """
+    Short-lived in-process cache of authenticated users, keyed by the user id's string
+    form so a token's subject can be looked up without parsing it into a UUID.
+
+    Holds detached User rows (role and customer record loaded) that are never attached
+    to a request's session; callers copy them in with Session.merge(load=False), which
+    issues no query.
+
+    Writes through user_crud/customer_crud invalidate the local entry and publish the
+    id on INVALIDATION_CHANNEL, which every worker's listener thread applies. While
+    Redis is unreachable other workers can't be told, so a changed user (role, active
+    flag, deletion) may be served stale for at most the TTL; the listener clears the
+    whole cache whenever it (re)subscribes, so nothing missed during an outage lingers.
+    """
+
+    def __init__(self, ttl_seconds: int, maxsize: int = 10_000, client: Optional[redis.Redis] = None):
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._client = client
+        self._listener: Optional[threading.Thread] = None
+
+    def get(self, user_id: Union[UUID, str]) -> Optional[User]:
+        """Get a cached detached user, if present and not expired"""
+        key = str(user_id)
+        with self._lock:
+            return self._users.get(key)
+
+    def set(self, user: User) -> None:
+        """Cache a detached user"""
+        with self._lock:
+            self._users[str(user.id)] = user
+
+    def discard(self, user_id: Union[UUID, str]) -> None:
+        """Drop a user's entry from this process only"""
+        key = str(user_id)
+        with self._lock:
+            self._users.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry in this process"""
+        with self._lock:
+            self._users.clear()
+
+    def invalidate(self, user_id: Union[UUID, str]) -> None:
+        """Drop a user's cached row after it changes, here and in every other worker"""
+        self.discard(user_id)
+        if self._client is None:
+            return
+        try:
+            self._client.publish(INVALIDATION_CHANNEL, str(user_id))
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish auth cache invalidation for {user_id}: {e}")
+
+    def start_listener(self) -> None:
+        """Start the background thread applying other workers' invalidations (idempotent)"""
+        if self._client is None or self._listener is not None:
+            return
+        self._listener = threading.Thread(
+            target=self._listen, name="auth-user-cache-invalidation", daemon=True
+        )
+        self._listener.start()
+
+    def _listen(self) -> None:
+        """Apply published invalidations, resubscribing after Redis errors"""
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything published while unsubscribed was missed
+                self.clear()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.discard(message["data"].decode())
+            except redis.RedisError as e:
+                logger.warning(f"Auth cache invalidation listener lost Redis, retrying: {e}")
+                time.sleep(1.0)
+            finally:
+                pubsub.close()
+
+authenticated_user_cache = AuthenticatedUserCache(
+    ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS, client=redis_client
+)
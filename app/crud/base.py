@@ -1,14 +1,46 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import ColumnElement, func, insert, inspect, tuple_, update
+from sqlalchemy.orm import Query, Session
 from uuid import UUID
-from datetime import datetime
+
+from app.models.base import SoftDeleteMixin
 
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# (sort value, primary key) of the last row on a page; pass back as `after`
+KeysetCursor = Tuple[Any, Any]
+
+# Largest IN (...) list sent in one query by get_many_by_ids
+IN_BATCH_SIZE = 1000
+
+def session_memo(db: Session) -> Dict[Any, Any]:
+    """
+    Lookups memoized on the session, i.e. for one request (get_db opens a session per request).
+    
+    For rows fetched by a unique non-key column; primary key lookups already hit the
+    session's identity map via db.get().
+    """
+    return db.info.setdefault("crud_memo", {})
+
+def server_now(column: Any) -> ColumnElement:
+    """The database's current time for a timestamp column; naive columns hold UTC wall-clock time"""
+    if column.type.timezone:
+        return func.now()
+    return func.timezone("UTC", func.now())
+
+def commit_keeping_loaded(db: Session) -> None:
+    """Commit without expiring loaded attributes, so RETURNING values need no refresh SELECT"""
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -20,10 +52,27 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        # Decided once per CRUD object, so active-record queries build the same statement every call
+        self._has_soft_delete = hasattr(model, 'deleted_at')
+        # SoftDeleteMixin models are already filtered on every SELECT by the session
+        needs_filter = self._has_soft_delete and not issubclass(model, SoftDeleteMixin)
+        self._active_filter = (model.deleted_at.is_(None),) if needs_filter else ()
+        self._has_updated_at = hasattr(model, 'updated_at')
 
     def get(self, db: Session, id: UUID) -> Optional[ModelType]:
-        """Get a single record by ID"""
-        return db.query(self.model).filter(self.model.id == id).first()
+        """Get a single record by ID (identity map first, then a cached primary key SELECT)"""
+        return db.get(self.model, id)
+
+    def get_many_by_ids(self, db: Session, *, ids: Sequence[UUID]) -> Dict[UUID, ModelType]:
+        """Get several records by ID with IN (...) queries, keyed by ID (missing IDs are left out)"""
+        id_column = inspect(self.model).primary_key[0]
+        unique_ids = list(dict.fromkeys(ids))
+        found: Dict[UUID, ModelType] = {}
+        for start in range(0, len(unique_ids), IN_BATCH_SIZE):
+            batch = unique_ids[start:start + IN_BATCH_SIZE]
+            for row in db.query(self.model).filter(id_column.in_(batch)):
+                found[getattr(row, id_column.key)] = row
+        return found
 
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
@@ -31,13 +80,41 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Get multiple records with pagination"""
         return db.query(self.model).offset(skip).limit(limit).all()
 
+    def get_multi_keyset(
+        self,
+        db: Session,
+        *,
+        after: Optional[KeysetCursor] = None,
+        limit: int = 100,
+        query: Optional[Query] = None,
+        order_by: Optional[Any] = None
+    ) -> Tuple[List[ModelType], Optional[KeysetCursor]]:
+        """
+        Get records newest first, seeking past a keyset cursor instead of using OFFSET.
+        
+        Orders by (order_by, primary key) descending, `order_by` defaulting to created_at.
+        `query` lets callers pass in their own filtered/eager-loaded query. Returns the
+        page and the cursor for the next one (None once a page comes back short).
+        """
+        order_column = order_by if order_by is not None else self.model.created_at
+        id_column = inspect(self.model).primary_key[0]
+        if query is None:
+            query = db.query(self.model)
+        if after is not None:
+            query = query.filter(tuple_(order_column, id_column) < tuple_(*after))
+        
+        rows = query.order_by(order_column.desc(), id_column.desc()).limit(limit).all()
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_cursor = (getattr(last, order_column.key), getattr(last, id_column.key))
+        return rows, next_cursor
+
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        """Create a new record"""
+        """Create a new record, reading server defaults back with RETURNING"""
         obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db_obj = db.execute(insert(self.model).values(**obj_in_data).returning(self.model)).scalar_one()
+        commit_keeping_loaded(db)
         return db_obj
 
     def update(
@@ -48,47 +125,67 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
         """Update an existing record"""
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+            update_data = obj_in.model_dump(exclude_unset=True)
+        columns = inspect(self.model).column_attrs.keys()
+        values = {field: value for field, value in update_data.items() if field in columns}
         
-        # Update the updated_at timestamp if it exists
-        if hasattr(db_obj, 'updated_at'):
-            setattr(db_obj, 'updated_at', datetime.utcnow())
-            
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        # Bump updated_at even when nothing else changed
+        if self._has_updated_at and 'updated_at' not in values:
+            values['updated_at'] = server_now(self.model.updated_at)
+        if not values:
+            return db_obj
+        return self.update_returning(db, db_obj=db_obj, values=values)
+    
+    def update_returning(self, db: Session, *, db_obj: ModelType, values: Dict[str, Any]) -> ModelType:
+        """
+        UPDATE db_obj's row and load its new state from RETURNING, then commit.
+        
+        Replaces the add/commit/refresh sequence with a single statement; db_obj is
+        repopulated in place (and returned), so pending changes on it are discarded.
+        """
+        id_column = inspect(self.model).primary_key[0]
+        stmt = (
+            update(self.model)
+            .where(id_column == getattr(db_obj, id_column.key))
+            .values(**values)
+            .returning(self.model)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        db_obj = db.execute(stmt).scalar_one()
+        commit_keeping_loaded(db)
         return db_obj
 
     def remove(self, db: Session, *, id: UUID) -> ModelType:
         """Hard delete a record"""
-        obj = db.query(self.model).get(id)
+        obj = db.get(self.model, id)
         db.delete(obj)
         db.commit()
+        session_memo(db).clear()
         return obj
     
     def soft_delete(self, db: Session, *, id: UUID) -> Optional[ModelType]:
         """Soft delete a record (set deleted_at timestamp)"""
-        obj = db.query(self.model).get(id)
-        if obj and hasattr(obj, 'deleted_at'):
-            obj.deleted_at = datetime.utcnow()
-            db.add(obj)
-            db.commit()
-            db.refresh(obj)
+        if not self._has_soft_delete:
+            return db.get(self.model, id)
+        
+        id_column = inspect(self.model).primary_key[0]
+        stmt = (
+            update(self.model)
+            .where(id_column == id)
+            .values(deleted_at=server_now(self.model.deleted_at))
+            .returning(self.model)
+            .execution_options(populate_existing=True, synchronize_session=False)
+        )
+        obj = db.execute(stmt).scalar_one_or_none()
+        commit_keeping_loaded(db)
         return obj
     
     def get_active(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
         """Get active records (not soft deleted)"""
-        query = db.query(self.model)
-        if hasattr(self.model, 'deleted_at'):
-            query = query.filter(self.model.deleted_at.is_(None))
-        return query.offset(skip).limit(limit).all()
+        return db.query(self.model).filter(*self._active_filter).offset(skip).limit(limit).all()
     
     def count(self, db: Session) -> int:
         """Count total records"""
@@ -96,7 +193,4 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     
     def count_active(self, db: Session) -> int:
         """Count active records (not soft deleted)"""
-        query = db.query(self.model)
-        if hasattr(self.model, 'deleted_at'):
-            query = query.filter(self.model.deleted_at.is_(None))
-        return query.count()
\ No newline at end of file
+        return db.query(self.model).filter(*self._active_filter).count()
\ No newline at end of file
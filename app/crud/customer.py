@@ -1,41 +1,49 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import ColumnElement, select, update
+from sqlalchemy.orm import Session, contains_eager, joinedload, raiseload, selectinload
 from uuid import UUID
 
+from app.core.user_cache import authenticated_user_cache
+from app.crud.qr_code import qr_code_crud
 from app.models.customer import Customer
+from app.models.qr_code import QRCode
+from app.models.role import Role
+from app.models.trainer import Trainer
 from app.models.user import User
 from app.schemas.customer import CustomerCreate, CustomerUpdate
-from .base import CRUDBase
+from .base import CRUDBase, KeysetCursor
 
 class CRUDCustomer(CRUDBase[Customer, CustomerCreate, CustomerUpdate]):
     def get_by_user_id(self, db: Session, *, user_id: UUID) -> Optional[Customer]:
-        """Get customer by user ID"""
+        """Get customer by user ID (the primary key, so repeat lookups in a request hit the identity map)"""
+        return db.get(Customer, user_id, options=[joinedload(Customer.user), joinedload(Customer.trainer)])
+    
+    def get_by_user_id_with_trainer(self, db: Session, *, user_id: UUID) -> Optional[Customer]:
+        """Get customer by user ID with the assigned trainer's user and trainer records"""
         return (
             db.query(Customer)
-            .options(joinedload(Customer.user), joinedload(Customer.trainer))
+            .options(joinedload(Customer.trainer).joinedload(User.trainer))
             .filter(Customer.user_id == user_id)
             .first()
         )
     
-    def get_by_trainer_id(self, db: Session, *, trainer_id: UUID, skip: int = 0, limit: int = 100) -> List[Customer]:
-        """Get customers by trainer ID"""
-        return (
+    def get_by_trainer_id(
+        self, db: Session, *, trainer_id: UUID, after: Optional[KeysetCursor] = None, limit: int = 100
+    ) -> Tuple[List[Customer], Optional[KeysetCursor]]:
+        """Get customers by trainer ID, newest first, with the cursor for the next page"""
+        query = (
             db.query(Customer)
-            .options(joinedload(Customer.user), joinedload(Customer.trainer))
+            .options(joinedload(Customer.user), joinedload(Customer.trainer), raiseload("*"))
             .filter(Customer.trainer_id == trainer_id)
-            .filter(Customer.deleted_at.is_(None))
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
+        return self.get_multi_keyset(db, after=after, limit=limit, query=query)
     
     def get_without_trainer(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Customer]:
         """Get customers without assigned trainer"""
         return (
             db.query(Customer)
-            .options(joinedload(Customer.user))
+            .options(joinedload(Customer.user), raiseload("*"))
             .filter(Customer.trainer_id.is_(None))
-            .filter(Customer.deleted_at.is_(None))
             .offset(skip)
             .limit(limit)
             .all()
@@ -45,51 +53,137 @@ class CRUDCustomer(CRUDBase[Customer, CustomerCreate, CustomerUpdate]):
         """Get customers with assigned trainer"""
         return (
             db.query(Customer)
-            .options(joinedload(Customer.user), joinedload(Customer.trainer))
+            .options(joinedload(Customer.user), joinedload(Customer.trainer), raiseload("*"))
             .filter(Customer.trainer_id.isnot(None))
-            .filter(Customer.deleted_at.is_(None))
             .offset(skip)
             .limit(limit)
             .all()
         )
     
+    def get_user_with_customer(self, db: Session, *, user_id: UUID) -> Optional[User]:
+        """Get a user (role joined) and their customer record, if any, in one query"""
+        return (
+            db.query(User)
+            .outerjoin(Customer, Customer.user_id == User.id)
+            .options(contains_eager(User.customer))
+            .filter(User.id == user_id)
+            .first()
+        )
+    
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Customer,
+        obj_in: Union[CustomerUpdate, Dict[str, Any]]
+    ) -> Customer:
+        """Update a customer and drop the cached authenticated user that carries it"""
+        customer = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        authenticated_user_cache.invalidate(customer.user_id)
+        return customer
+    
+    def soft_delete(self, db: Session, *, id: UUID) -> Optional[Customer]:
+        """Soft delete a customer and drop the cached authenticated user that carries it"""
+        customer = super().soft_delete(db, id=id)
+        authenticated_user_cache.invalidate(id)
+        return customer
+    
     def assign_trainer(self, db: Session, *, customer_id: UUID, trainer_id: UUID) -> Optional[Customer]:
         """Assign trainer to customer"""
         customer = db.query(Customer).filter(Customer.user_id == customer_id).first()
         if customer:
-            customer.trainer_id = trainer_id
-            db.add(customer)
-            db.commit()
-            db.refresh(customer)
+            self.set_trainer(db, customer=customer, trainer_id=trainer_id)
+        return customer
+    
+    def set_trainer(self, db: Session, *, customer: Customer, trainer_id: UUID) -> Customer:
+        """Assign trainer to an already loaded customer"""
+        customer = self.update_returning(db, db_obj=customer, values={"trainer_id": trainer_id})
+        qr_code_crud.invalidate_scan_subject(db, user_id=customer.user_id)
+        authenticated_user_cache.invalidate(customer.user_id)
         return customer
     
     def unassign_trainer(self, db: Session, *, customer_id: UUID) -> Optional[Customer]:
         """Remove trainer from customer"""
         customer = db.query(Customer).filter(Customer.user_id == customer_id).first()
         if customer:
-            customer.trainer_id = None
-            db.add(customer)
-            db.commit()
-            db.refresh(customer)
+            customer = self.update_returning(db, db_obj=customer, values={"trainer_id": None})
+            qr_code_crud.invalidate_scan_subject(db, user_id=customer_id)
+            authenticated_user_cache.invalidate(customer_id)
         return customer
     
-    def get_active(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Customer]:
-        """Get active customers with user and trainer info"""
-        return (
+    def assign_trainer_if_eligible(self, db: Session, *, customer_id: UUID, trainer_id: UUID) -> bool:
+        """
+        Assign trainer to customer in a single UPDATE, provided the trainer's user is
+        active and the customer's user is active and has the Customer role.
+        Returns False, changing nothing, when any of that does not hold.
+        """
+        trainer_is_active = (
+            select(Trainer.user_id)
+            .join(User, User.id == Trainer.user_id)
+            .where(Trainer.user_id == trainer_id, User.active.is_(True), User.deleted_at.is_(None))
+            .exists()
+        )
+        customer_is_active = (
+            select(User.id)
+            .join(User.role)
+            .where(
+                User.id == Customer.user_id,
+                User.active.is_(True),
+                User.deleted_at.is_(None),
+                Role.name == "Customer"
+            )
+            .exists()
+        )
+        return self._guarded_set_trainer(
+            db, customer_id=customer_id, trainer_id=trainer_id, guards=[trainer_is_active, customer_is_active]
+        )
+    
+    def unassign_trainer_if_trainer_exists(self, db: Session, *, customer_id: UUID, trainer_id: UUID) -> bool:
+        """Remove trainer from customer in a single UPDATE, provided trainer_id is a trainer"""
+        trainer_exists = select(Trainer.user_id).where(Trainer.user_id == trainer_id).exists()
+        return self._guarded_set_trainer(db, customer_id=customer_id, trainer_id=None, guards=[trainer_exists])
+    
+    def _guarded_set_trainer(
+        self,
+        db: Session,
+        *,
+        customer_id: UUID,
+        trainer_id: Optional[UUID],
+        guards: List[ColumnElement[bool]]
+    ) -> bool:
+        """Set a customer's trainer when guards hold, commit, and drop their cached scan data and user"""
+        stmt = (
+            update(Customer)
+            .where(Customer.user_id == customer_id, *guards)
+            .values(trainer_id=trainer_id)
+            .returning(select(QRCode.token).where(QRCode.user_id == Customer.user_id).scalar_subquery())
+        )
+        row = db.execute(stmt).first()
+        if row is None:
+            return False
+        db.commit()
+        qr_code_crud.invalidate_scan_token(row[0])
+        authenticated_user_cache.invalidate(customer_id)
+        return True
+    
+    def get_active(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[UUID] = None
+    ) -> List[Customer]:
+        """Get active customers with user and trainer info, ordered by id; after_id continues from a keyset cursor"""
+        # selectinload keeps the paged query on customers only and fetches
+        # users/trainers (and their joined roles) in one IN (...) query each
+        query = (
             db.query(Customer)
-            .options(joinedload(Customer.user), joinedload(Customer.trainer))
-            .filter(Customer.deleted_at.is_(None))
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .options(selectinload(Customer.user), selectinload(Customer.trainer), raiseload("*"))
         )
+        if after_id is not None:
+            query = query.filter(Customer.user_id > after_id)
+        return query.order_by(Customer.user_id).offset(skip).limit(limit).all()
     
     def update_profile_data(self, db: Session, *, customer: Customer, profile_data: dict) -> Customer:
         """Update customer profile data"""
-        customer.profile_data = profile_data
-        db.add(customer)
-        db.commit()
-        db.refresh(customer)
+        customer = self.update_returning(db, db_obj=customer, values={"profile_data": profile_data})
+        authenticated_user_cache.invalidate(customer.user_id)
         return customer
     
     def count_by_trainer(self, db: Session, *, trainer_id: UUID) -> int:
@@ -97,7 +191,6 @@ class CRUDCustomer(CRUDBase[Customer, CustomerCreate, CustomerUpdate]):
         return (
             db.query(Customer)
             .filter(Customer.trainer_id == trainer_id)
-            .filter(Customer.deleted_at.is_(None))
             .count()
         )
 
@@ -1,14 +1,18 @@
 import secrets
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, server_now
 from app.models.password_reset_token import PasswordResetToken
 from app.models.user import User
 
+# Rows deleted per statement (and transaction) by cleanup_expired
+CLEANUP_BATCH_SIZE = 5000
+
 class CRUDPasswordResetToken(CRUDBase[PasswordResetToken, None, None]):
     def create_for_user(
         self, 
@@ -17,26 +21,33 @@ class CRUDPasswordResetToken(CRUDBase[PasswordResetToken, None, None]):
         user_id: UUID,
         expires_in_hours: int = 24
     ) -> PasswordResetToken:
-        """Create a password reset token for a user"""
-        # Invalidate any existing tokens for this user
-        db.query(self.model).filter(
-            self.model.user_id == user_id,
-            self.model.used == False
-        ).update({"used": True})
+        """
+        Create a password reset token for a user, invalidating their unused ones.
+        The returned token is detached, with every column loaded from RETURNING.
+        """
+        # Invalidate any existing tokens for this user in the same statement as the
+        # insert (a data-modifying CTE runs even though nothing selects from it)
+        invalidate_existing = (
+            update(self.model)
+            .where(self.model.user_id == user_id, self.model.used.is_(False))
+            .values(used=True)
+            .cte("invalidated")
+        )
         
-        # Generate new token
+        # Generate new token; expiry comes from the database clock, like cleanup_expired
         token = secrets.token_urlsafe(32)
-        expires_at = datetime.utcnow() + timedelta(hours=expires_in_hours)
+        expires_at = server_now(self.model.expires_at) + timedelta(hours=expires_in_hours)
         
-        db_obj = PasswordResetToken(
-            user_id=user_id,
-            token=token,
-            expires_at=expires_at,
-            used=False
+        stmt = (
+            insert(self.model)
+            .values(user_id=user_id, token=token, expires_at=expires_at, used=False)
+            .returning(self.model)
+            .add_cte(invalidate_existing)
         )
-        db.add(db_obj)
+        db_obj = db.execute(stmt).scalar_one()
+        # Detach so commit does not expire the RETURNING values (no refresh SELECT)
+        db.expunge(db_obj)
         db.commit()
-        db.refresh(db_obj)
         return db_obj
     
     def get_by_token(
@@ -71,12 +82,31 @@ class CRUDPasswordResetToken(CRUDBase[PasswordResetToken, None, None]):
         
         return reset_token.user
     
-    def cleanup_expired(self, db: Session) -> int:
-        """Delete expired tokens (cleanup task)"""
-        result = db.query(self.model).filter(
-            self.model.expires_at < datetime.utcnow()
-        ).delete()
-        db.commit()
-        return result
+    def cleanup_expired(self, db: Session, *, batch_size: int = CLEANUP_BATCH_SIZE) -> int:
+        """
+        Delete expired tokens (cleanup task), returning how many were removed.
+        
+        Deletes in batches, committing each, so a large backlog never holds row locks on
+        the whole set in one long transaction; no ORM instances are loaded or synchronized.
+        """
+        expired_batch = (
+            select(self.model.id)
+            .where(self.model.expires_at < func.now())
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        stmt = (
+            delete(self.model)
+            .where(self.model.id.in_(expired_batch))
+            .execution_options(synchronize_session=False)
+        )
+        
+        deleted = 0
+        while True:
+            count = db.execute(stmt).rowcount
+            db.commit()
+            deleted += count
+            if count < batch_size:
+                return deleted
 
 password_reset_token_crud = CRUDPasswordResetToken(PasswordResetToken)
\ No newline at end of file
@@ -1,38 +1,49 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload, raiseload
 from uuid import UUID
 
 from app.models.profile import Profile
 from app.models.user import User
 from app.schemas.profile import ProfileCreate, ProfileUpdate
-from .base import CRUDBase
+from .base import CRUDBase, KeysetCursor, commit_keeping_loaded
 
 class CRUDProfile(CRUDBase[Profile, ProfileCreate, ProfileUpdate]):
     def get_by_user_id(self, db: Session, *, user_id: UUID) -> Optional[Profile]:
-        """Get profile by user ID with user information"""
-        return (
-            db.query(Profile)
-            .options(joinedload(Profile.user))
-            .filter(Profile.user_id == user_id)
-            .first()
+        """Get profile by user ID with user information (the primary key, so repeat lookups in a request hit the identity map)"""
+        return db.get(Profile, user_id, options=[joinedload(Profile.user)])
+    
+    def get_or_create_for_user(self, db: Session, *, user_id: UUID) -> Profile:
+        """Get a user's profile, creating an empty one if it doesn't exist"""
+        profile = self.get_by_user_id(db, user_id=user_id)
+        if profile:
+            return profile
+        
+        # Single round-trip create that can't fail if a concurrent request got there first
+        stmt = (
+            insert(Profile)
+            .values(user_id=user_id, preferences={})
+            .on_conflict_do_nothing(index_elements=[Profile.user_id])
+            .returning(Profile)
         )
+        profile = db.execute(stmt).scalar_one_or_none()
+        db.commit()
+        return profile or self.get_by_user_id(db, user_id=user_id)
     
     def create_for_user(self, db: Session, *, user_id: UUID, obj_in: ProfileCreate) -> Profile:
         """Create a profile for a specific user"""
-        create_data = obj_in.dict()
+        create_data = obj_in.model_dump()
         create_data["user_id"] = user_id
         
-        db_obj = Profile(**create_data)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db_obj = db.execute(insert(Profile).values(**create_data).returning(Profile)).scalar_one()
+        commit_keeping_loaded(db)
         return db_obj
     
     def get_profiles_with_pictures(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Profile]:
         """Get profiles that have profile pictures"""
         return (
             db.query(Profile)
-            .options(joinedload(Profile.user))
+            .options(joinedload(Profile.user), raiseload("*"))
             .filter(Profile.profile_picture_url.isnot(None))
             .offset(skip)
             .limit(limit)
@@ -43,7 +54,7 @@ class CRUDProfile(CRUDBase[Profile, ProfileCreate, ProfileUpdate]):
         """Get profiles that are considered complete (have bio and picture)"""
         return (
             db.query(Profile)
-            .options(joinedload(Profile.user))
+            .options(joinedload(Profile.user), raiseload("*"))
             .filter(Profile.bio.isnot(None))
             .filter(Profile.profile_picture_url.isnot(None))
             .offset(skip)
@@ -55,7 +66,7 @@ class CRUDProfile(CRUDBase[Profile, ProfileCreate, ProfileUpdate]):
         """Get profiles that have emergency contact information"""
         return (
             db.query(Profile)
-            .options(joinedload(Profile.user))
+            .options(joinedload(Profile.user), raiseload("*"))
             .filter(Profile.emergency_contact.isnot(None))
             .offset(skip)
             .limit(limit)
@@ -94,7 +105,7 @@ class CRUDProfile(CRUDBase[Profile, ProfileCreate, ProfileUpdate]):
         """Search profiles by bio content"""
         return (
             db.query(Profile)
-            .options(joinedload(Profile.user))
+            .options(joinedload(Profile.user), raiseload("*"))
             .filter(Profile.bio.ilike(f"%{search_term}%"))
             .offset(skip)
             .limit(limit)
@@ -131,30 +142,19 @@ class CRUDProfile(CRUDBase[Profile, ProfileCreate, ProfileUpdate]):
             .count()
         )
     
-    def get_all_with_user(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Profile]:
-        """Get all profiles with user information"""
-        return (
-            db.query(Profile)
-            .options(joinedload(Profile.user))
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+    def get_all_with_user(
+        self, db: Session, *, after: Optional[KeysetCursor] = None, limit: int = 100
+    ) -> Tuple[List[Profile], Optional[KeysetCursor]]:
+        """Get all profiles with user information, newest first, with the cursor for the next page"""
+        query = db.query(Profile).options(joinedload(Profile.user), raiseload("*"))
+        return self.get_multi_keyset(db, after=after, limit=limit, query=query)
     
     def update_profile_picture(self, db: Session, *, profile: Profile, picture_url: str) -> Profile:
         """Update only the profile picture URL"""
-        profile.profile_picture_url = picture_url
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-        return profile
+        return self.update_returning(db, db_obj=profile, values={"profile_picture_url": picture_url})
     
     def update_bio(self, db: Session, *, profile: Profile, bio: str) -> Profile:
         """Update only the bio"""
-        profile.bio = bio
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-        return profile
+        return self.update_returning(db, db_obj=profile, values={"bio": bio})
 
 profile_crud = CRUDProfile(Profile)
\ No newline at end of file
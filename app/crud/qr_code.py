@@ -1,56 +1,131 @@
-from typing import Optional
+from typing import Any, Dict, Optional
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session, joinedload
 from uuid import UUID
 import secrets
 import string
 
+from app.core.cache import cache_delete, cache_get, cache_set
+from app.core.config import settings
+from app.models.customer import Customer
 from app.models.qr_code import QRCode
+from app.models.user import User
 from app.schemas.qr_code import QRCodeCreate, QRCodeUpdate
-from .base import CRUDBase
+from .base import CRUDBase, session_memo
+
+# Attempts at a fresh random token before giving up; a collision at ~131 bits is
+# practically impossible, so this only bounds the loop
+TOKEN_INSERT_ATTEMPTS = 3
+
+# Hot single-row lookups, built once with named parameters so every call reuses
+# the same statement object and its compiled SQL
+_BY_TOKEN = select(QRCode).options(joinedload(QRCode.user)).where(QRCode.token == bindparam("token"))
+_BY_TOKEN_WITH_RELATIONS = (
+    select(QRCode)
+    .options(
+        joinedload(QRCode.user)
+        .joinedload(User.customer)
+        .joinedload(Customer.trainer)
+    )
+    .where(QRCode.token == bindparam("token"))
+)
+_BY_USER = select(QRCode).options(joinedload(QRCode.user)).where(QRCode.user_id == bindparam("user_id"))
+
+def _scan_cache_key(token: str) -> str:
+    return f"qr-scan:{token}"
 
 class CRUDQRCode(CRUDBase[QRCode, QRCodeCreate, QRCodeUpdate]):
     def get_by_token(self, db: Session, *, token: str) -> Optional[QRCode]:
-        """Get QR code by token"""
-        return (
-            db.query(QRCode)
-            .options(joinedload(QRCode.user))
-            .filter(QRCode.token == token)
-            .first()
-        )
+        """Get QR code by token, memoized for the rest of the request"""
+        memo = session_memo(db)
+        key = ("QRCode.get_by_token", token)
+        if key in memo:
+            return memo[key]
+        
+        qr_code = db.execute(_BY_TOKEN, {"token": token}).scalar_one_or_none()
+        # Misses aren't memoized, so a code created later in the request is still found
+        if qr_code:
+            memo[key] = qr_code
+        return qr_code
+    
+    def get_by_token_with_relations(self, db: Session, *, token: str) -> Optional[QRCode]:
+        """Get QR code by token with its user, customer record and assigned trainer"""
+        return db.execute(_BY_TOKEN_WITH_RELATIONS, {"token": token}).scalar_one_or_none()
+    
+    def get_scan_subject(self, db: Session, *, token: str) -> Optional[Dict[str, Any]]:
+        """Get what a scan needs to know about a QR code's owner, cached briefly in Redis"""
+        key = _scan_cache_key(token)
+        subject = cache_get(key)
+        if subject is not None:
+            return subject
+        
+        qr_code = self.get_by_token_with_relations(db, token=token)
+        if not qr_code:
+            return None
+        
+        user = qr_code.user
+        if not user:
+            subject = {"qr_code_id": str(qr_code.id), "user_id": None}
+        else:
+            customer = user.customer
+            trainer = customer.trainer if customer else None
+            subject = {
+                "qr_code_id": str(qr_code.id),
+                "user_id": str(user.id),
+                "user_name": user.full_name,
+                "user_role": user.role_name,
+                "active": user.active and user.deleted_at is None,
+                "trainer_id": str(customer.trainer_id) if customer and customer.trainer_id else None,
+                "trainer_name": trainer.full_name if trainer else None,
+            }
+        cache_set(key, subject, settings.QR_SCAN_CACHE_TTL_SECONDS)
+        return subject
+    
+    def invalidate_scan_subject(self, db: Session, *, user_id: UUID) -> None:
+        """Drop a user's cached scan data after their status or trainer changes"""
+        token = db.query(QRCode.token).filter(QRCode.user_id == user_id).scalar()
+        self.invalidate_scan_token(token)
+    
+    def invalidate_scan_token(self, token: Optional[str]) -> None:
+        """Drop cached scan data for a token the caller already has"""
+        if token:
+            cache_delete(_scan_cache_key(token))
     
     def get_by_user(self, db: Session, *, user_id: UUID) -> Optional[QRCode]:
         """Get QR code for a user (one-to-one relationship)"""
-        return (
-            db.query(QRCode)
-            .options(joinedload(QRCode.user))
-            .filter(QRCode.user_id == user_id)
-            .first()
-        )
-    
-    def generate_unique_token(self, db: Session, *, length: int = 32) -> str:
-        """Generate a unique token for QR code"""
-        while True:
-            token = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(length))
-            existing = db.query(QRCode).filter(QRCode.token == token).first()
-            if not existing:
-                return token
+        return db.execute(_BY_USER, {"user_id": user_id}).scalar_one_or_none()
+    
+    def generate_token(self, *, length: int = 22) -> str:
+        """Generate a random token for QR code (uniqueness is enforced by the insert)"""
+        # 22 alphanumeric chars is ~131 bits of entropy; shorter keys keep the token index dense
+        return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(length))
+    
+    def get_or_create_for_user(self, db: Session, *, user_id: UUID) -> QRCode:
+        """Get a user's QR code, creating it if it doesn't exist"""
+        return self.get_by_user(db, user_id=user_id) or self.create_for_user(db, user_id=user_id)
     
     def create_for_user(self, db: Session, *, user_id: UUID) -> QRCode:
         """Create a permanent QR code for a user"""
-        # Check if user already has a QR code
-        existing_qr = self.get_by_user(db, user_id=user_id)
-        if existing_qr:
-            return existing_qr
-        
-        token = self.generate_unique_token(db)
-        qr_code = QRCode(
-            user_id=user_id,
-            token=token
-        )
+        for _ in range(TOKEN_INSERT_ATTEMPTS):
+            # No conflict target: skips the row on either unique key, user_id or token
+            stmt = (
+                insert(QRCode)
+                .values(user_id=user_id, token=self.generate_token())
+                .on_conflict_do_nothing()
+                .returning(QRCode)
+            )
+            qr_code = db.execute(stmt).scalar_one_or_none()
+            db.commit()
+            if qr_code:
+                return qr_code
+            
+            # If the user already has a QR code (e.g. a concurrent request), keep the existing one;
+            # otherwise the token collided, so try another
+            existing = self.get_by_user(db, user_id=user_id)
+            if existing:
+                return existing
         
-        db.add(qr_code)
-        db.commit()
-        db.refresh(qr_code)
-        return qr_code
+        raise RuntimeError(f"Could not generate a unique QR code token for user {user_id}")
 
 qr_code_crud = CRUDQRCode(QRCode)
\ No newline at end of file
@@ -1,22 +1,38 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func, desc, Date, distinct
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, contains_eager, joinedload, raiseload, selectinload
+from sqlalchemy import Select, and_, bindparam, exists, func, desc, Date, distinct, select
+from sqlalchemy.dialects.postgresql import insert
 from uuid import UUID
 from datetime import date, datetime
 
+from app.core.cache import cache_get, cache_set
+from app.core.config import settings
+from app.models.qr_code import QRCode
 from app.models.session_tracking import SessionTracking
 from app.schemas.session_tracking import SessionTrackingCreate, SessionTrackingUpdate, SessionTrackingStats
-from .base import CRUDBase
+from .base import CRUDBase, KeysetCursor
+
+# Built once with named parameters so every duplicate check reuses the compiled SQL
+_SCAN_EXISTS = select(
+    exists().where(
+        SessionTracking.qr_code_id == bindparam("qr_code_id"),
+        SessionTracking.session_volume_id == bindparam("session_volume_id"),
+        SessionTracking.session_date == bindparam("session_date")
+    )
+)
 
 class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, SessionTrackingUpdate]):
     def get_by_trainer(self, db: Session, *, trainer_id: UUID, skip: int = 0, limit: int = 100) -> List[SessionTracking]:
         """Get all session tracking records by a trainer"""
+        # In these paged lists many rows share a trainer, QR code and volume; selectinload
+        # fetches each distinct one once with IN (...) instead of repeating it on every row
         return (
             db.query(SessionTracking)
             .options(
-                joinedload(SessionTracking.trainer),
-                joinedload(SessionTracking.qr_code),
-                joinedload(SessionTracking.session_volume)
+                selectinload(SessionTracking.trainer),
+                selectinload(SessionTracking.qr_code),
+                selectinload(SessionTracking.session_volume),
+                raiseload("*")
             )
             .filter(SessionTracking.trainer_id == trainer_id)
             .order_by(desc(SessionTracking.scan_timestamp))
@@ -30,9 +46,10 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         return (
             db.query(SessionTracking)
             .options(
-                joinedload(SessionTracking.trainer),
-                joinedload(SessionTracking.qr_code),
-                joinedload(SessionTracking.session_volume)
+                selectinload(SessionTracking.trainer),
+                selectinload(SessionTracking.qr_code),
+                selectinload(SessionTracking.session_volume),
+                raiseload("*")
             )
             .filter(SessionTracking.qr_code_id == qr_code_id)
             .order_by(desc(SessionTracking.scan_timestamp))
@@ -46,9 +63,10 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         return (
             db.query(SessionTracking)
             .options(
-                joinedload(SessionTracking.trainer),
-                joinedload(SessionTracking.qr_code),
-                joinedload(SessionTracking.session_volume)
+                selectinload(SessionTracking.trainer),
+                selectinload(SessionTracking.qr_code),
+                selectinload(SessionTracking.session_volume),
+                raiseload("*")
             )
             .filter(SessionTracking.session_volume_id == session_volume_id)
             .order_by(desc(SessionTracking.scan_timestamp))
@@ -60,9 +78,10 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
     def get_by_date(self, db: Session, *, session_date: date, trainer_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[SessionTracking]:
         """Get session tracking records for a specific date"""
         query = db.query(SessionTracking).options(
-            joinedload(SessionTracking.trainer),
-            joinedload(SessionTracking.qr_code),
-            joinedload(SessionTracking.session_volume)
+            selectinload(SessionTracking.trainer),
+            selectinload(SessionTracking.qr_code),
+            selectinload(SessionTracking.session_volume),
+            raiseload("*")
         ).filter(SessionTracking.session_date == session_date)
         
         if trainer_id:
@@ -84,14 +103,15 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         end_date: date,
         trainer_id: Optional[UUID] = None,
         session_volume_id: Optional[UUID] = None,
-        skip: int = 0, 
+        after: Optional[KeysetCursor] = None,
         limit: int = 100
-    ) -> List[SessionTracking]:
-        """Get session tracking records for a date range"""
+    ) -> Tuple[List[SessionTracking], Optional[KeysetCursor]]:
+        """Get session tracking records for a date range, latest scan first, with the cursor for the next page"""
         query = db.query(SessionTracking).options(
-            joinedload(SessionTracking.trainer),
-            joinedload(SessionTracking.qr_code),
-            joinedload(SessionTracking.session_volume)
+            selectinload(SessionTracking.trainer),
+            selectinload(SessionTracking.qr_code),
+            selectinload(SessionTracking.session_volume),
+            raiseload("*")
         ).filter(
             and_(
                 SessionTracking.session_date >= start_date,
@@ -105,12 +125,8 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         if session_volume_id:
             query = query.filter(SessionTracking.session_volume_id == session_volume_id)
         
-        return (
-            query
-            .order_by(desc(SessionTracking.scan_timestamp))
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return self.get_multi_keyset(
+            db, after=after, limit=limit, query=query, order_by=SessionTracking.scan_timestamp
         )
     
     def create_scan(
@@ -121,22 +137,30 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         qr_code_id: UUID,
         session_volume_id: UUID,
         session_date: Optional[date] = None
-    ) -> SessionTracking:
-        """Create a new session tracking record for a scan"""
+    ) -> Optional[SessionTracking]:
+        """
+        Create a new session tracking record for a scan in one INSERT ... RETURNING.
+        
+        Returns None, inserting nothing, when the trainer already scanned this QR code
+        on session_date (uq_session_tracking_trainer_qr_date). Does not commit.
+        """
         if session_date is None:
             session_date = date.today()
         
-        tracking = SessionTracking(
-            trainer_id=trainer_id,
-            qr_code_id=qr_code_id,
-            session_volume_id=session_volume_id,
-            session_date=session_date
+        stmt = (
+            insert(SessionTracking)
+            .values(
+                trainer_id=trainer_id,
+                qr_code_id=qr_code_id,
+                session_volume_id=session_volume_id,
+                session_date=session_date
+            )
+            .on_conflict_do_nothing(
+                index_elements=[SessionTracking.trainer_id, SessionTracking.qr_code_id, SessionTracking.session_date]
+            )
+            .returning(SessionTracking)
         )
-        
-        db.add(tracking)
-        db.commit()
-        db.refresh(tracking)
-        return tracking
+        return db.execute(stmt).scalar_one_or_none()
     
     def check_duplicate_scan(
         self,
@@ -147,15 +171,8 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         session_date: date
     ) -> bool:
         """Check if a scan already exists for the same QR code, volume, and date"""
-        existing = db.query(SessionTracking).filter(
-            and_(
-                SessionTracking.qr_code_id == qr_code_id,
-                SessionTracking.session_volume_id == session_volume_id,
-                SessionTracking.session_date == session_date
-            )
-        ).first()
-        
-        return existing is not None
+        params = {"qr_code_id": qr_code_id, "session_volume_id": session_volume_id, "session_date": session_date}
+        return db.execute(_SCAN_EXISTS, params).scalar()
     
     def get_session_count(
         self,
@@ -186,16 +203,15 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
             db.query(SessionTracking)
             .options(
                 joinedload(SessionTracking.trainer),
-                joinedload(SessionTracking.qr_code).joinedload('user'),
+                joinedload(SessionTracking.qr_code),
                 joinedload(SessionTracking.session_volume)
             )
             .filter(SessionTracking.id == id)
             .first()
         )
     
-    def get_filtered(
+    def filtered_statement(
         self,
-        db: Session,
         *,
         skip: int = 0,
         limit: int = 100,
@@ -203,39 +219,61 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         customer_id: Optional[UUID] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
-    ) -> List[SessionTracking]:
-        """Get session tracking records with filters"""
-        query = (
-            db.query(SessionTracking)
+    ) -> Select:
+        """Build the filtered session tracking query, newest first, with relations eager-loaded"""
+        # All relations are many-to-one, so joining them can't multiply rows
+        stmt = (
+            select(SessionTracking)
+            .join(SessionTracking.qr_code)
             .options(
                 joinedload(SessionTracking.trainer),
-                joinedload(SessionTracking.qr_code).joinedload('user'),
-                joinedload(SessionTracking.session_volume)
+                contains_eager(SessionTracking.qr_code),
+                joinedload(SessionTracking.session_volume),
+                raiseload("*")
             )
         )
         
         if trainer_id:
-            query = query.filter(SessionTracking.trainer_id == trainer_id)
+            stmt = stmt.where(SessionTracking.trainer_id == trainer_id)
             
         if customer_id:
-            query = query.join(SessionTracking.qr_code).filter(
-                SessionTracking.qr_code.has(user_id=customer_id)
-            )
+            stmt = stmt.where(QRCode.user_id == customer_id)
             
         if start_date:
-            query = query.filter(SessionTracking.session_date >= start_date)
+            stmt = stmt.where(SessionTracking.session_date >= start_date)
             
         if end_date:
-            query = query.filter(SessionTracking.session_date <= end_date)
+            stmt = stmt.where(SessionTracking.session_date <= end_date)
         
         return (
-            query
+            stmt
             .order_by(desc(SessionTracking.session_date), desc(SessionTracking.scan_timestamp))
             .offset(skip)
             .limit(limit)
-            .all()
         )
     
+    def get_filtered(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        trainer_id: Optional[UUID] = None,
+        customer_id: Optional[UUID] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[SessionTracking]:
+        """Get session tracking records with filters"""
+        stmt = self.filtered_statement(
+            skip=skip,
+            limit=limit,
+            trainer_id=trainer_id,
+            customer_id=customer_id,
+            start_date=start_date,
+            end_date=end_date
+        )
+        return list(db.execute(stmt).scalars())
+    
     def get_by_customer(
         self,
         db: Session,
@@ -248,32 +286,14 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         end_date: Optional[date] = None
     ) -> List[SessionTracking]:
         """Get sessions for a specific customer"""
-        query = (
-            db.query(SessionTracking)
-            .join(SessionTracking.qr_code)
-            .options(
-                joinedload(SessionTracking.trainer),
-                joinedload(SessionTracking.qr_code).joinedload('user'),
-                joinedload(SessionTracking.session_volume)
-            )
-            .filter(SessionTracking.qr_code.has(user_id=customer_id))
-        )
-        
-        if trainer_id:
-            query = query.filter(SessionTracking.trainer_id == trainer_id)
-            
-        if start_date:
-            query = query.filter(SessionTracking.session_date >= start_date)
-            
-        if end_date:
-            query = query.filter(SessionTracking.session_date <= end_date)
-        
-        return (
-            query
-            .order_by(desc(SessionTracking.session_date), desc(SessionTracking.scan_timestamp))
-            .offset(skip)
-            .limit(limit)
-            .all()
+        return self.get_filtered(
+            db,
+            skip=skip,
+            limit=limit,
+            trainer_id=trainer_id,
+            customer_id=customer_id,
+            start_date=start_date,
+            end_date=end_date
         )
     
     def get_stats(
@@ -285,49 +305,35 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> SessionTrackingStats:
-        """Get session tracking statistics"""
-        query = db.query(SessionTracking)
+        """Get session tracking statistics, cached briefly per filter combination"""
+        key = f"session-stats:{trainer_id}:{customer_id}:{start_date}:{end_date}"
+        cached = cache_get(key)
+        if cached is not None:
+            return SessionTrackingStats(**cached)
+        
+        # One aggregate query; min/max are NULL and counts 0 when nothing matches
+        stmt = select(
+            func.count(SessionTracking.id).label("total_scans"),
+            func.count(distinct(SessionTracking.session_date)).label("unique_days"),
+            func.min(SessionTracking.scan_timestamp).label("first_scan"),
+            func.max(SessionTracking.scan_timestamp).label("last_scan")
+        )
         
         if trainer_id:
-            query = query.filter(SessionTracking.trainer_id == trainer_id)
+            stmt = stmt.where(SessionTracking.trainer_id == trainer_id)
             
         if customer_id:
-            query = query.join(SessionTracking.qr_code).filter(
-                SessionTracking.qr_code.has(user_id=customer_id)
-            )
+            stmt = stmt.join(SessionTracking.qr_code).where(QRCode.user_id == customer_id)
             
         if start_date:
-            query = query.filter(SessionTracking.session_date >= start_date)
+            stmt = stmt.where(SessionTracking.session_date >= start_date)
             
         if end_date:
-            query = query.filter(SessionTracking.session_date <= end_date)
-        
-        # Get basic stats
-        total_scans = query.count()
+            stmt = stmt.where(SessionTracking.session_date <= end_date)
         
-        if total_scans == 0:
-            return SessionTrackingStats(
-                total_scans=0,
-                unique_days=0,
-                first_scan=None,
-                last_scan=None
-            )
-        
-        # Get unique days
-        unique_days = query.with_entities(distinct(SessionTracking.session_date)).count()
-        
-        # Get first and last scan timestamps
-        scan_times = query.with_entities(
-            func.min(SessionTracking.scan_timestamp).label('first_scan'),
-            func.max(SessionTracking.scan_timestamp).label('last_scan')
-        ).first()
-        
-        return SessionTrackingStats(
-            total_scans=total_scans,
-            unique_days=unique_days,
-            first_scan=scan_times.first_scan,
-            last_scan=scan_times.last_scan
-        )
+        stats = SessionTrackingStats.model_validate(db.execute(stmt).one())
+        cache_set(key, stats.model_dump(mode="json"), settings.SESSION_STATS_CACHE_TTL_SECONDS)
+        return stats
     
     def check_daily_limit(
         self,
@@ -356,29 +362,31 @@ class CRUDSessionTracking(CRUDBase[SessionTracking, SessionTrackingCreate, Sessi
         trainer_id: Optional[UUID] = None,
         qr_code_id: Optional[UUID] = None
     ) -> dict:
-        """Get session tracking statistics (legacy method)"""
-        query = db.query(SessionTracking)
-        
+        """Get session tracking statistics (legacy method) in a single aggregate query"""
+        filters = []
         if session_volume_id:
-            query = query.filter(SessionTracking.session_volume_id == session_volume_id)
+            filters.append(SessionTracking.session_volume_id == session_volume_id)
         if trainer_id:
-            query = query.filter(SessionTracking.trainer_id == trainer_id)
+            filters.append(SessionTracking.trainer_id == trainer_id)
         if qr_code_id:
-            query = query.filter(SessionTracking.qr_code_id == qr_code_id)
+            filters.append(SessionTracking.qr_code_id == qr_code_id)
         
-        total_scans = query.count()
-        unique_days = db.query(func.count(func.distinct(SessionTracking.session_date))).filter(
-            query.whereclause if query.whereclause is not None else True
-        ).scalar() or 0
-        
-        first_scan = query.order_by(SessionTracking.scan_timestamp).first()
-        last_scan = query.order_by(desc(SessionTracking.scan_timestamp)).first()
+        total_scans, unique_days, first_scan, last_scan = (
+            db.query(
+                func.count(SessionTracking.id),
+                func.count(distinct(SessionTracking.session_date)),
+                func.min(SessionTracking.scan_timestamp),
+                func.max(SessionTracking.scan_timestamp)
+            )
+            .filter(*filters)
+            .one()
+        )
         
         return {
             "total_scans": total_scans,
             "unique_days": unique_days,
-            "first_scan": first_scan.scan_timestamp if first_scan else None,
-            "last_scan": last_scan.scan_timestamp if last_scan else None
+            "first_scan": first_scan,
+            "last_scan": last_scan
         }
 
 session_tracking_crud = CRUDSessionTracking(SessionTracking)
\ No newline at end of file
@@ -1,6 +1,8 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, func
+from typing import Iterable, List, Optional
+from sqlalchemy.orm import Session, joinedload, raiseload
+from sqlalchemy import ColumnElement, Date, Select, and_, cast, func, lambda_stmt, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 from uuid import UUID
 from datetime import date
 
@@ -29,7 +31,7 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         """Get all session volume records for a user"""
         return (
             db.query(SessionVolume)
-            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer))
+            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer), raiseload("*"))
             .filter(
                 and_(
                     SessionVolume.user_id == user_id,
@@ -45,7 +47,7 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         """Get all session volume records for a trainer"""
         return (
             db.query(SessionVolume)
-            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer))
+            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer), raiseload("*"))
             .filter(
                 and_(
                     SessionVolume.trainer_id == trainer_id,
@@ -100,7 +102,7 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         """Get all unique user-trainer pairs with session volumes"""
         return (
             db.query(SessionVolume)
-            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer))
+            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer), raiseload("*"))
             .filter(SessionVolume.deleted_at.is_(None))
             .offset(skip)
             .limit(limit)
@@ -111,7 +113,7 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         """Get session volumes that have notes"""
         return (
             db.query(SessionVolume)
-            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer))
+            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer), raiseload("*"))
             .filter(
                 and_(
                     SessionVolume.notes.isnot(None),
@@ -127,7 +129,7 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         """Get session volumes with high session counts"""
         return (
             db.query(SessionVolume)
-            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer))
+            .options(joinedload(SessionVolume.user), joinedload(SessionVolume.trainer), raiseload("*"))
             .filter(
                 and_(
                     SessionVolume.session_count >= min_sessions,
@@ -164,19 +166,11 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
     
     def soft_delete(self, db: Session, *, db_obj: SessionVolume) -> SessionVolume:
         """Soft delete a session volume record"""
-        db_obj.deleted_at = func.now()
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self.update_returning(db, db_obj=db_obj, values={"deleted_at": func.now()})
     
     def restore(self, db: Session, *, db_obj: SessionVolume) -> SessionVolume:
         """Restore a soft deleted session volume record"""
-        db_obj.deleted_at = None
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self.update_returning(db, db_obj=db_obj, values={"deleted_at": None})
     
     def get_or_create_for_period(
         self,
@@ -186,42 +180,73 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         customer_id: UUID,
         period: date
     ) -> SessionVolume:
-        """Get or create session volume for a specific period"""
-        existing = (
+        """
+        Get or create session volume for a specific period.
+        
+        INSERT ... ON CONFLICT DO NOTHING against the live trainer-customer-period
+        unique index, so concurrent first calls can't race; an existing volume
+        costs one extra SELECT. Does not commit.
+        """
+        stmt = (
+            insert(SessionVolume)
+            .values(trainer_id=trainer_id, customer_id=customer_id, period=period, session_count=0)
+            .on_conflict_do_nothing(
+                index_elements=[SessionVolume.trainer_id, SessionVolume.customer_id, SessionVolume.period],
+                index_where=SessionVolume.deleted_at.is_(None)
+            )
+            .returning(SessionVolume)
+        )
+        created = db.execute(stmt).scalar_one_or_none()
+        if created:
+            return created
+        
+        return (
             db.query(SessionVolume)
             .filter(
-                and_(
-                    SessionVolume.trainer_id == trainer_id,
-                    SessionVolume.customer_id == customer_id,
-                    SessionVolume.period == period,
-                    SessionVolume.deleted_at.is_(None)
-                )
+                SessionVolume.trainer_id == trainer_id,
+                SessionVolume.customer_id == customer_id,
+                SessionVolume.period == period,
+                SessionVolume.deleted_at.is_(None)
             )
-            .first()
+            .one()
         )
+    
+    def add_session_for_period(
+        self,
+        db: Session,
+        *,
+        trainer_id: UUID,
+        customer_id: UUID,
+        period: date
+    ) -> SessionVolume:
+        """
+        Count one more session in a period's volume, creating the volume if needed.
         
-        if existing:
-            return existing
-        
-        # Create new session volume
-        volume_data = SessionVolumeCreate(
+        A single upsert that inserts with a count of 1 or increments the live
+        volume, returning it with the new count. Does not commit.
+        """
+        stmt = insert(SessionVolume).values(
             trainer_id=trainer_id,
             customer_id=customer_id,
             period=period,
-            session_count=0
+            session_count=1
         )
-        
-        return self.create(db, obj_in=volume_data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SessionVolume.trainer_id, SessionVolume.customer_id, SessionVolume.period],
+            index_where=SessionVolume.deleted_at.is_(None),
+            set_={"session_count": SessionVolume.session_count + 1, "updated_at": func.now()}
+        ).returning(SessionVolume)
+        return db.execute(stmt).scalar_one()
     
-    def increment_session_count(self, db: Session, *, session_volume_id: UUID) -> SessionVolume:
-        """Increment session count for a volume"""
-        volume = self.get(db, id=session_volume_id)
-        if volume:
-            volume.session_count += 1
-            db.add(volume)
-            db.commit()
-            db.refresh(volume)
-        return volume
+    def increment_session_count(self, db: Session, *, session_volume_id: UUID) -> int:
+        """Increment session count for a volume and return the new count. Does not commit."""
+        stmt = (
+            update(SessionVolume)
+            .where(SessionVolume.id == session_volume_id)
+            .values(session_count=SessionVolume.session_count + 1)
+            .returning(SessionVolume.session_count)
+        )
+        return db.execute(stmt).scalar_one()
     
     def decrement_session_count(self, db: Session, *, session_volume_id: UUID) -> SessionVolume:
         """Decrement session count for a volume (when deleting sessions)"""
@@ -233,6 +258,98 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
             db.refresh(volume)
         return volume
     
+    def transition_status(
+        self,
+        db: Session,
+        *,
+        id: UUID,
+        from_statuses: Iterable[str],
+        to_status: str,
+        trainer_id: Optional[UUID] = None,
+        customer_id: Optional[UUID] = None,
+        note_title: Optional[str] = None,
+        note: Optional[str] = None
+    ) -> Optional[SessionVolume]:
+        """
+        Move a volume to a new status in a single UPDATE ... RETURNING.
+        
+        The row only changes if it is live, currently in one of from_statuses
+        and, when given, belongs to trainer_id/customer_id. A note is appended
+        under a "--- note_title (date) ---" heading dated by the database.
+        Returns None if nothing matched; the caller works out why. Does not commit.
+        """
+        values = {"status": to_status}
+        if note:
+            utc_today = cast(func.timezone("UTC", func.now()), Date)
+            values["notes"] = func.concat(
+                func.coalesce(SessionVolume.notes, ""),
+                f"\n--- {note_title} (", utc_today, ") ---\n",
+                note
+            )
+        
+        return self._guarded_update(
+            db,
+            id=id,
+            guard=SessionVolume.status.in_(from_statuses),
+            values=values,
+            trainer_id=trainer_id,
+            customer_id=customer_id
+        )
+    
+    def update_unless_status(
+        self,
+        db: Session,
+        *,
+        id: UUID,
+        obj_in: SessionVolumeUpdate,
+        locked_statuses: Iterable[str],
+        trainer_id: Optional[UUID] = None
+    ) -> Optional[SessionVolume]:
+        """Update a live volume in one UPDATE ... RETURNING unless it is in locked_statuses. Does not commit."""
+        values = obj_in.model_dump(exclude_unset=True)
+        values["updated_at"] = func.now()
+        return self._guarded_update(
+            db,
+            id=id,
+            guard=SessionVolume.status.notin_(locked_statuses),
+            values=values,
+            trainer_id=trainer_id
+        )
+    
+    def soft_delete_unless_status(self, db: Session, *, id: UUID, locked_statuses: Iterable[str]) -> bool:
+        """Soft delete a live volume unless it is in locked_statuses; True if it was deleted. Does not commit."""
+        return self._guarded_update(
+            db,
+            id=id,
+            guard=SessionVolume.status.notin_(locked_statuses),
+            values={"deleted_at": func.now()}
+        ) is not None
+    
+    def _guarded_update(
+        self,
+        db: Session,
+        *,
+        id: UUID,
+        guard: ColumnElement[bool],
+        values: dict,
+        trainer_id: Optional[UUID] = None,
+        customer_id: Optional[UUID] = None
+    ) -> Optional[SessionVolume]:
+        """Apply values to a live volume matching guard and ownership, returning the updated row"""
+        conditions = [SessionVolume.id == id, SessionVolume.deleted_at.is_(None), guard]
+        if trainer_id is not None:
+            conditions.append(SessionVolume.trainer_id == trainer_id)
+        if customer_id is not None:
+            conditions.append(SessionVolume.customer_id == customer_id)
+        
+        stmt = (
+            update(SessionVolume)
+            .where(*conditions)
+            .values(**values)
+            .returning(SessionVolume)
+        )
+        return db.execute(stmt).scalar_one_or_none()
+    
     def get_with_relations(self, db: Session, *, id: UUID) -> Optional[SessionVolume]:
         """Get session volume with related data"""
         return (
@@ -245,9 +362,8 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
             .first()
         )
     
-    def get_filtered(
+    def filtered_statement(
         self,
-        db: Session,
         *,
         skip: int = 0,
         limit: int = 100,
@@ -256,39 +372,57 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         status: Optional[str] = None,
         start_period: Optional[date] = None,
         end_period: Optional[date] = None
-    ) -> List[SessionVolume]:
-        """Get session volumes with filters"""
-        query = (
-            db.query(SessionVolume)
-            .options(
-                joinedload(SessionVolume.customer),
-                joinedload(SessionVolume.trainer)
-            )
-            .filter(SessionVolume.deleted_at.is_(None))
-        )
+    ) -> StatementLambdaElement:
+        """Build the filtered session volume query, newest period first"""
+        # lambda_stmt caches the built statement per combination of filters, so
+        # repeat calls skip query construction and compilation entirely
+        stmt = lambda_stmt(lambda: _live_volumes_with_users())
         
         if trainer_id:
-            query = query.filter(SessionVolume.trainer_id == trainer_id)
+            stmt += lambda s: s.where(SessionVolume.trainer_id == trainer_id)
             
         if customer_id:
-            query = query.filter(SessionVolume.customer_id == customer_id)
+            stmt += lambda s: s.where(SessionVolume.customer_id == customer_id)
             
         if status:
-            query = query.filter(SessionVolume.status == status)
+            stmt += lambda s: s.where(SessionVolume.status == status)
             
         if start_period:
-            query = query.filter(SessionVolume.period >= start_period)
+            stmt += lambda s: s.where(SessionVolume.period >= start_period)
             
         if end_period:
-            query = query.filter(SessionVolume.period <= end_period)
+            stmt += lambda s: s.where(SessionVolume.period <= end_period)
         
-        return (
-            query
-            .order_by(SessionVolume.period.desc(), SessionVolume.created_at.desc())
+        stmt += lambda s: (
+            s.order_by(SessionVolume.period.desc(), SessionVolume.created_at.desc())
             .offset(skip)
             .limit(limit)
-            .all()
         )
+        return stmt
+    
+    def get_filtered(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        trainer_id: Optional[UUID] = None,
+        customer_id: Optional[UUID] = None,
+        status: Optional[str] = None,
+        start_period: Optional[date] = None,
+        end_period: Optional[date] = None
+    ) -> List[SessionVolume]:
+        """Get session volumes with filters"""
+        stmt = self.filtered_statement(
+            skip=skip,
+            limit=limit,
+            trainer_id=trainer_id,
+            customer_id=customer_id,
+            status=status,
+            start_period=start_period,
+            end_period=end_period
+        )
+        return list(db.execute(stmt).scalars())
     
     def get_by_period(
         self,
@@ -299,24 +433,27 @@ class CRUDSessionVolume(CRUDBase[SessionVolume, SessionVolumeCreate, SessionVolu
         customer_id: Optional[UUID] = None
     ) -> List[SessionVolume]:
         """Get session volumes for a specific period"""
-        query = (
-            db.query(SessionVolume)
-            .options(
-                joinedload(SessionVolume.customer),
-                joinedload(SessionVolume.trainer)
-            )
-            .filter(
-                SessionVolume.period == period,
-                SessionVolume.deleted_at.is_(None)
-            )
-        )
+        stmt = lambda_stmt(lambda: _live_volumes_with_users().where(SessionVolume.period == period))
         
         if trainer_id:
-            query = query.filter(SessionVolume.trainer_id == trainer_id)
+            stmt += lambda s: s.where(SessionVolume.trainer_id == trainer_id)
             
         if customer_id:
-            query = query.filter(SessionVolume.customer_id == customer_id)
+            stmt += lambda s: s.where(SessionVolume.customer_id == customer_id)
         
-        return query.order_by(SessionVolume.created_at.desc()).all()
+        stmt += lambda s: s.order_by(SessionVolume.created_at.desc())
+        return list(db.execute(stmt).scalars())
+
+def _live_volumes_with_users() -> Select:
+    """Non-deleted session volumes with customer and trainer joined in"""
+    return (
+        select(SessionVolume)
+        .options(
+            joinedload(SessionVolume.customer),
+            joinedload(SessionVolume.trainer),
+            raiseload("*")
+        )
+        .where(SessionVolume.deleted_at.is_(None))
+    )
 
 session_volume_crud = CRUDSessionVolume(SessionVolume)
\ No newline at end of file
@@ -1,13 +1,20 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Date, cast, func, select, true
+from sqlalchemy.orm import Session, defer, joinedload, raiseload
 from uuid import UUID
 
+from app.core.cache import cache_delete, cache_get, cache_set
+from app.core.config import settings
 from app.models.trainer import Trainer
 from app.models.customer import Customer
+from app.models.session_tracking import SessionTracking
 from app.models.user import User
-from app.schemas.trainer import TrainerCreate, TrainerUpdate
+from app.schemas.trainer import TrainerCreate, TrainerListResponse, TrainerResponse, TrainerUpdate
 from .base import CRUDBase
 
+def _details_cache_key(user_id: UUID) -> str:
+    return f"trainer-details:{user_id}"
+
 class CRUDTrainer(CRUDBase[Trainer, TrainerCreate, TrainerUpdate]):
     def get_by_user_id(self, db: Session, *, user_id: UUID) -> Optional[Trainer]:
         """Get trainer by user ID"""
@@ -33,7 +40,6 @@ class CRUDTrainer(CRUDBase[Trainer, TrainerCreate, TrainerUpdate]):
                 db.query(Customer)
                 .options(joinedload(Customer.user))
                 .filter(Customer.trainer_id == trainer_id)
-                .filter(Customer.deleted_at.is_(None))
                 .all()
             )
             # Manually add customers to avoid complex SQLAlchemy relationships
@@ -46,7 +52,6 @@ class CRUDTrainer(CRUDBase[Trainer, TrainerCreate, TrainerUpdate]):
         trainers = (
             db.query(Trainer)
             .options(joinedload(Trainer.user))
-            .filter(Trainer.deleted_at.is_(None))
             .offset(skip)
             .limit(limit)
             .all()
@@ -57,41 +62,88 @@ class CRUDTrainer(CRUDBase[Trainer, TrainerCreate, TrainerUpdate]):
             trainer.customer_count = (
                 db.query(Customer)
                 .filter(Customer.trainer_id == trainer.user_id)
-                .filter(Customer.deleted_at.is_(None))
                 .count()
             )
         
         return trainers
     
-    def get_active(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Trainer]:
-        """Get active trainers with user info"""
-        return (
+    def get_active(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[UUID] = None
+    ) -> List[Trainer]:
+        """Get active trainers with user info, ordered by id; after_id continues from a keyset cursor"""
+        query = (
             db.query(Trainer)
-            .options(joinedload(Trainer.user))
-            .filter(Trainer.deleted_at.is_(None))
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .options(
+                joinedload(Trainer.user).options(joinedload(User.role), defer(User.password_hash, raiseload=True)),
+                raiseload("*")
+            )
         )
+        if after_id is not None:
+            query = query.filter(Trainer.user_id > after_id)
+        return query.order_by(Trainer.user_id).offset(skip).limit(limit).all()
     
-    def get_customers(self, db: Session, *, trainer_id: UUID, skip: int = 0, limit: int = 100) -> List[Customer]:
-        """Get customers for a specific trainer"""
-        return (
+    def get_active_cached(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """Get active trainers as serialized TrainerListResponse dicts, cached briefly per page"""
+        key = f"trainer-list:{skip}:{limit}:{after_id}"
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+        
+        trainers = [
+            TrainerListResponse.model_validate(trainer).model_dump(mode="json")
+            for trainer in self.get_active(db, skip=skip, limit=limit, after_id=after_id)
+        ]
+        cache_set(key, trainers, settings.TRAINER_LIST_CACHE_TTL_SECONDS)
+        return trainers
+    
+    def get_details_cached(self, db: Session, *, user_id: UUID) -> Optional[Dict[str, Any]]:
+        """Get a trainer as a serialized TrainerResponse dict, cached until their user changes"""
+        key = _details_cache_key(user_id)
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+        
+        trainer = self.get_by_user_id(db, user_id=user_id)
+        if not trainer:
+            return None
+        details = TrainerResponse.model_validate(trainer).model_dump(mode="json")
+        cache_set(key, details, settings.TRAINER_DETAILS_CACHE_TTL_SECONDS)
+        return details
+    
+    def invalidate_details(self, *, user_id: UUID) -> None:
+        """Drop a trainer's cached details after their user changes; lists expire on their own"""
+        cache_delete(_details_cache_key(user_id))
+    
+    def get_customers(
+        self,
+        db: Session,
+        *,
+        trainer_id: UUID,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[UUID] = None
+    ) -> List[Customer]:
+        """Get customers for a specific trainer, ordered by id; after_id continues from a keyset cursor"""
+        query = (
             db.query(Customer)
-            .options(joinedload(Customer.user))
+            .options(
+                joinedload(Customer.user).options(joinedload(User.role), defer(User.password_hash, raiseload=True)),
+                joinedload(Customer.trainer).options(joinedload(User.role), defer(User.password_hash, raiseload=True)),
+                raiseload("*")
+            )
             .filter(Customer.trainer_id == trainer_id)
-            .filter(Customer.deleted_at.is_(None))
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
+        if after_id is not None:
+            query = query.filter(Customer.user_id > after_id)
+        return query.order_by(Customer.user_id).offset(skip).limit(limit).all()
     
     def has_customers(self, db: Session, *, trainer_id: UUID) -> bool:
         """Check if trainer has any customers"""
         return (
             db.query(Customer)
             .filter(Customer.trainer_id == trainer_id)
-            .filter(Customer.deleted_at.is_(None))
             .count() > 0
         )
     
@@ -100,7 +152,6 @@ class CRUDTrainer(CRUDBase[Trainer, TrainerCreate, TrainerUpdate]):
         return (
             db.query(Trainer)
             .options(joinedload(Trainer.user))
-            .filter(Trainer.deleted_at.is_(None))
             .join(User)
             .filter(User.active == True)
             .offset(skip)
@@ -108,4 +159,32 @@ class CRUDTrainer(CRUDBase[Trainer, TrainerCreate, TrainerUpdate]):
             .all()
         )
 
+    def get_stats(self, db: Session, *, trainer_id: UUID) -> Dict[str, int]:
+        """Get customer and session counts for a trainer in one round trip"""
+        customer_counts = (
+            select(
+                func.count().label("total_customers"),
+                func.count().filter(User.active.is_(True), User.deleted_at.is_(None)).label("active_customers")
+            )
+            .select_from(Customer)
+            .join(User, User.id == Customer.user_id)
+            .where(Customer.trainer_id == trainer_id)
+            .subquery()
+        )
+        month_start = cast(func.date_trunc("month", func.current_date()), Date)
+        session_counts = (
+            select(
+                func.count().label("total_sessions"),
+                func.count().filter(SessionTracking.session_date >= month_start).label("sessions_this_month")
+            )
+            .where(SessionTracking.trainer_id == trainer_id)
+            .subquery()
+        )
+        # Both sides are single-row aggregates, so the cross join is one row; joining
+        # ON true spells it out so SQLAlchemy doesn't warn about a cartesian product
+        stmt = select(customer_counts, session_counts).select_from(
+            customer_counts.join(session_counts, true())
+        )
+        return dict(db.execute(stmt).one()._mapping)
+
 trainer_crud = CRUDTrainer(Trainer)
\ No newline at end of file
@@ -1,13 +1,34 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+import hashlib
+import hmac
+import threading
+from typing import Any, Dict, List, Optional, Union
+from cachetools import TTLCache
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, contains_eager, defer, joinedload, raiseload
 from uuid import UUID
 
-from app.models.user import User
+from app.models.customer import Customer
 from app.models.role import Role
+from app.models.trainer import Trainer
+from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
+from app.core.user_cache import authenticated_user_cache
+from app.crud.qr_code import qr_code_crud
+from app.crud.trainer import trainer_crud
 from .base import CRUDBase
 
+# Recently failed (email, password) pairs; repeats are rejected without another bcrypt
+# check. Keyed on the pair, not the email alone, so the right password is never refused
+_failed_logins = TTLCache(maxsize=10_000, ttl=60)
+_failed_logins_lock = threading.Lock()
+
+def _login_key(email: str, password: str) -> tuple[str, str]:
+    """Cache key for a login attempt; the password is only kept as a keyed digest"""
+    digest = hmac.new(settings.SECRET_KEY.encode(), password.encode(), hashlib.sha256).hexdigest()
+    return email, digest
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         """Get user by email with role"""
@@ -18,26 +39,69 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             .first()
         )
     
-    def get_by_role(self, db: Session, *, role_name: str, skip: int = 0, limit: int = 100) -> List[User]:
-        """Get users by role name"""
+    def get_with_customer(self, db: Session, *, id: UUID) -> Optional[User]:
+        """Get user by ID with their customer record (if any)"""
         return (
             db.query(User)
-            .options(joinedload(User.role))
+            .options(joinedload(User.customer))
+            .filter(User.id == id)
+            .first()
+        )
+    
+    def get_with_profile(self, db: Session, *, id: UUID) -> Optional[User]:
+        """Get user by ID with their profile (if any)"""
+        return (
+            db.query(User)
+            .options(joinedload(User.profile))
+            .filter(User.id == id)
+            .first()
+        )
+    
+    def get_by_role(
+        self,
+        db: Session,
+        *,
+        role_name: str,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[UUID] = None
+    ) -> List[User]:
+        """Get users by role name, ordered by id; after_id continues from a keyset cursor"""
+        query = (
+            db.query(User)
             .join(User.role)
+            .options(contains_eager(User.role), defer(User.password_hash, raiseload=True), raiseload("*"))
             .filter(Role.name == role_name)
             .filter(User.deleted_at.is_(None))
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        return query.order_by(User.id).offset(skip).limit(limit).all()
+    
+    def get_active(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[UUID] = None
+    ) -> List[User]:
+        """Get active users with their role, ordered by id; after_id continues from a keyset cursor"""
+        query = (
+            db.query(User)
+            .options(joinedload(User.role), defer(User.password_hash, raiseload=True), raiseload("*"))
+            .filter(User.deleted_at.is_(None))
+        )
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        return query.order_by(User.id).offset(skip).limit(limit).all()
     
-    def get_trainers(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[User]:
+    def get_trainers(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[UUID] = None
+    ) -> List[User]:
         """Get all trainers"""
-        return self.get_by_role(db, role_name="Trainer", skip=skip, limit=limit)
+        return self.get_by_role(db, role_name="Trainer", skip=skip, limit=limit, after_id=after_id)
     
-    def get_customers(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[User]:
+    def get_customers(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after_id: Optional[UUID] = None
+    ) -> List[User]:
         """Get all customers"""
-        return self.get_by_role(db, role_name="Customer", skip=skip, limit=limit)
+        return self.get_by_role(db, role_name="Customer", skip=skip, limit=limit, after_id=after_id)
     
     def get_admins(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[User]:
         """Get all admins"""
@@ -45,11 +109,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
         """Create user with hashed password and role"""
-        from app.models.trainer import Trainer
-        from app.models.customer import Customer
-        from app.crud.qr_code import qr_code_crud
-
-        create_data = obj_in.dict()
+        create_data = obj_in.model_dump()
         create_data["password_hash"] = get_password_hash(create_data.pop("password"))
         role_name = create_data.pop("role", None)
 
@@ -60,70 +120,91 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
                 create_data["role_id"] = role.id
 
         # Create user with role_id
-        db_obj = User(**create_data)
-        db.add(db_obj)
+        db_obj = db.execute(insert(User).values(**create_data).returning(User)).scalar_one()
+        user_id = db_obj.id
         db.commit()
-        db.refresh(db_obj)
 
         # Create corresponding trainer or customer record based on role
         if role_name == "Trainer":
-            trainer = Trainer(
-                user_id=db_obj.id,
-                profile_picture_url=None
-            )
+            trainer = Trainer(user_id=user_id)
             db.add(trainer)
             db.commit()
         elif role_name == "Customer":
             customer = Customer(
-                user_id=db_obj.id,
+                user_id=user_id,
                 trainer_id=None,
-                profile_picture_url=None,
                 profile_data={}
             )
             db.add(customer)
             db.commit()
 
         # Auto-create QR code for all new users
-        qr_code_crud.create_for_user(db, user_id=db_obj.id)
+        qr_code_crud.create_for_user(db, user_id=user_id)
 
         return db_obj
     
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        """Update a user and drop their cached rows"""
+        user = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self._drop_cached(db, user.id)
+        self._forget_failed_logins(user.email)
+        return user
+    
+    def _drop_cached(self, db: Session, user_id: UUID) -> None:
+        """Drop the user's cached authentication row, QR scan data and, if they are a trainer, cached details"""
+        authenticated_user_cache.invalidate(user_id)
+        qr_code_crud.invalidate_scan_subject(db, user_id=user_id)
+        trainer_crud.invalidate_details(user_id=user_id)
+    
+    def soft_delete(self, db: Session, *, id: UUID) -> Optional[User]:
+        """Soft delete a user and drop their cached rows"""
+        user = super().soft_delete(db, id=id)
+        self._drop_cached(db, id)
+        return user
+    
     def set_role(self, db: Session, *, user: User, role_name: str) -> User:
         """Set user's role"""
         role = db.query(Role).filter(Role.name == role_name).first()
         if role:
-            user.role_id = role.id
-            db.add(user)
-            db.commit()
-            db.refresh(user)
+            user = self.update_returning(db, db_obj=user, values={"role_id": role.id})
+        self._drop_cached(db, user.id)
         return user
     
     def remove_role(self, db: Session, *, user: User) -> User:
         """Remove user's role"""
-        user.role_id = None
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user = self.update_returning(db, db_obj=user, values={"role_id": None})
+        self._drop_cached(db, user.id)
         return user
     
     def update_password(self, db: Session, *, user: User, new_password: str) -> User:
         """Update user password"""
-        from app.core.security import get_password_hash
-        
-        user.password_hash = get_password_hash(new_password)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user = self.update_returning(db, db_obj=user, values={"password_hash": get_password_hash(new_password)})
+        authenticated_user_cache.invalidate(user.id)
+        self._forget_failed_logins(user.email)
         return user
     
+    def _forget_failed_logins(self, email: str) -> None:
+        """Drop cached failed attempts for an email, e.g. after its password changes"""
+        with _failed_logins_lock:
+            for key in [key for key in _failed_logins.keys() if key[0] == email]:
+                _failed_logins.pop(key, None)
+    
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password"""
-        from app.core.security import verify_password
-        
+        key = _login_key(email, password)
+        with _failed_logins_lock:
+            if key in _failed_logins:
+                return None
         user = self.get_by_email(db, email=email)
-        if not user:
-            return None
-        if not verify_password(password, user.password_hash):
+        if not user or not verify_password(password, user.password_hash):
+            with _failed_logins_lock:
+                _failed_logins[key] = True
             return None
         return user
     
@@ -133,19 +214,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     
     def activate(self, db: Session, *, user: User) -> User:
         """Activate user"""
-        user.active = True
-        user.deleted_at = None
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user = self.update_returning(db, db_obj=user, values={"active": True, "deleted_at": None})
+        self._drop_cached(db, user.id)
         return user
     
     def deactivate(self, db: Session, *, user: User) -> User:
         """Deactivate user"""
-        user.active = False
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user = self.update_returning(db, db_obj=user, values={"active": False})
+        self._drop_cached(db, user.id)
         return user
 
 user_crud = CRUDUser(User)
\ No newline at end of file
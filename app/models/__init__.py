@@ -1,4 +1,4 @@
-from .base import Base
+from .base import Base, SoftDeleteMixin
 from .user import User
 from .customer import Customer
 from .trainer import Trainer
@@ -12,6 +12,7 @@ from .password_reset_token import PasswordResetToken
 # Export all models for easy imports
 __all__ = [
     "Base",
+    "SoftDeleteMixin",
     "User", 
     "Customer",
     "Trainer",
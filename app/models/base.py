@@ -1,4 +1,15 @@
-from sqlalchemy.orm import DeclarativeBase
+from datetime import datetime
+from sqlalchemy import DateTime
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 class Base(DeclarativeBase):
-    pass
\ No newline at end of file
+    pass
+
+class SoftDeleteMixin:
+    """
+    Soft-deletable rows that reads never need once deleted.
+    
+    Sessions from SessionLocal add deleted_at IS NULL wherever these models appear in
+    a SELECT (see app.core.database); pass execution_options(include_deleted=True) to see them.
+    """
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
\ No newline at end of file
@@ -5,9 +5,9 @@ from sqlalchemy import DateTime, Text, ForeignKey
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID as PGUUID, JSONB
 
-from .base import Base
+from .base import Base, SoftDeleteMixin
 
-class Customer(Base):
+class Customer(SoftDeleteMixin, Base):
     __tablename__ = "customers"
 
     user_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
@@ -15,7 +15,6 @@ class Customer(Base):
     profile_data: Mapped[dict] = mapped_column(JSONB, nullable=False, default={})
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    deleted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="customer")
@@ -1,6 +1,6 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from uuid import UUID, uuid4
-from sqlalchemy import ForeignKey, String, DateTime, func
+from sqlalchemy import ForeignKey, String, DateTime, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
@@ -16,6 +16,11 @@ class PasswordResetToken(Base):
     used: Mapped[bool] = mapped_column(default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
+    __table_args__ = (
+        Index("ix_password_reset_tokens_user_id_unused", "user_id", postgresql_where=text("used = false")),
+        Index("ix_password_reset_tokens_expires_at", "expires_at"),
+    )
+    
     # Relationships
     user = relationship("User", backref="password_reset_tokens")
     
@@ -24,7 +29,8 @@ class PasswordResetToken(Base):
     
     @property
     def is_expired(self) -> bool:
-        return datetime.utcnow() > self.expires_at
+        # expires_at is timestamptz, so compare against an aware UTC time
+        return datetime.now(timezone.utc) > self.expires_at
 
     @property
     def is_valid(self) -> bool:
@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from uuid import UUID, uuid4
-from sqlalchemy import ForeignKey, DateTime, Date, func
+from sqlalchemy import ForeignKey, DateTime, Date, Index, func
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
@@ -20,6 +20,11 @@ class SessionTracking(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
+    __table_args__ = (
+        # One scan per trainer-customer pair per day
+        Index("uq_session_tracking_trainer_qr_date", "trainer_id", "qr_code_id", "session_date", unique=True),
+    )
+    
     # Relationships
     trainer = relationship("User", back_populates="session_trackings")
     qr_code = relationship("QRCode", back_populates="session_trackings")
@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from uuid import UUID, uuid4
-from sqlalchemy import ForeignKey, Integer, Text, DateTime, Date, func, String, CheckConstraint
+from sqlalchemy import ForeignKey, Integer, Text, DateTime, Date, func, String, CheckConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
@@ -27,6 +27,19 @@ class SessionVolume(Base):
     # Add check constraint for status
     __table_args__ = (
         CheckConstraint("status IN ('draft', 'submitted', 'read', 'approved', 'rejected')", name="session_volumes_status_check"),
+        # One live volume per trainer-customer-period; soft-deleted rows don't count
+        Index(
+            "uq_session_volumes_trainer_customer_period",
+            "trainer_id", "customer_id", "period",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL")
+        ),
+        # Period-first for the monthly views, with the optional trainer/customer filters behind it
+        Index(
+            "ix_session_volumes_period_trainer_customer",
+            "period", "trainer_id", "customer_id",
+            postgresql_where=text("deleted_at IS NULL")
+        ),
     )
     
     # Relationships
@@ -5,15 +5,14 @@ from sqlalchemy import DateTime, Text, ForeignKey
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 
-from .base import Base
+from .base import Base, SoftDeleteMixin
 
-class Trainer(Base):
+class Trainer(SoftDeleteMixin, Base):
     __tablename__ = "trainers"
 
     user_id: Mapped[UUID] = mapped_column(PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    deleted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="trainer")
@@ -24,7 +24,8 @@ class User(Base):
     role_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("roles.id"), nullable=True)
     
     # Relationships
-    role = relationship("Role", back_populates="users")
+    # Role is checked on nearly every request (has_role, token claims), so join it in
+    role = relationship("Role", back_populates="users", lazy="joined")
     profile = relationship("Profile", back_populates="user", uselist=False)
     customer = relationship("Customer", foreign_keys="Customer.user_id", back_populates="user", uselist=False)
     trainer = relationship("Trainer", back_populates="user", uselist=False)
@@ -53,6 +54,9 @@ class User(Base):
     def has_role(self, role_name: str) -> bool:
         return bool(self.role and self.role.name == role_name)
 
+    def has_any_role(self, *role_names: str) -> bool:
+        return self.role_name in role_names
+
     def is_trainer(self) -> bool:
         return self.has_role("Trainer")
 
@@ -3,7 +3,7 @@ from typing import Optional, Dict, Any
 from pydantic import BaseModel, field_validator
 from uuid import UUID
 
-from .user import UserResponse
+from .user import UserResponse, user_response_row
 
 class ProfileBase(BaseModel):
     """Base schema with common profile fields"""
@@ -43,8 +43,7 @@ class ProfileCreate(ProfileBase):
     user_id: UUID
 
 class ProfileUpdate(BaseModel):
-    """Schema for updating a profile"""
-    profile_picture_url: Optional[str] = None
+    """Schema for updating a profile (the picture is only set via /profiles/upload-picture)"""
     bio: Optional[str] = None
     emergency_contact: Optional[str] = None
     preferences: Optional[Dict[str, Any]] = {}
@@ -57,14 +56,6 @@ class ProfileUpdate(BaseModel):
             raise ValueError('Bio must be 1000 characters or less')
         return v
     
-    @field_validator('profile_picture_url')
-    @classmethod
-    def validate_profile_picture_url(cls, v):
-        """Basic URL validation for profile picture"""
-        if v and not (v.startswith('http://') or v.startswith('https://')):
-            raise ValueError('Profile picture URL must start with http:// or https://')
-        return v
-    
     @field_validator('preferences', mode='before')
     @classmethod
     def validate_preferences(cls, v):
@@ -86,6 +77,19 @@ class ProfileResponse(ProfileBase):
     
     model_config = {'from_attributes': True}
 
+def profile_response_row(profile, user) -> dict:
+    """ProfileResponse fields read straight off a Profile row and its User, without validation"""
+    return {
+        "user_id": profile.user_id,
+        "profile_picture_url": profile.profile_picture_url,
+        "bio": profile.bio,
+        "emergency_contact": profile.emergency_contact,
+        "preferences": profile.preferences or {},
+        "created_at": profile.created_at,
+        "updated_at": profile.updated_at,
+        "user": user_response_row(user),
+    }
+
 class ProfileSummary(BaseModel):
     """Schema for profile summary (minimal info)"""
     user_id: UUID
@@ -59,4 +59,16 @@ class QRCodeSummary(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    model_config = {'from_attributes': True}
\ No newline at end of file
+    model_config = {'from_attributes': True}
+
+def qr_code_summary_row(qr_code) -> Optional[dict]:
+    """QRCodeSummary fields read straight off a QRCode row, without validation (bulk egress)"""
+    if qr_code is None:
+        return None
+    return {
+        "id": qr_code.id,
+        "user_id": qr_code.user_id,
+        "token": qr_code.token,
+        "created_at": qr_code.created_at,
+        "updated_at": qr_code.updated_at,
+    }
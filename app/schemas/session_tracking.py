@@ -3,9 +3,9 @@ from typing import Optional
 from pydantic import BaseModel
 from uuid import UUID
 
-from .user import UserResponse
-from .qr_code import QRCodeSummary
-from .session_volume import SessionVolumeSummary
+from .user import UserResponse, user_response_row
+from .qr_code import QRCodeSummary, qr_code_summary_row
+from .session_volume import SessionVolumeSummary, session_volume_summary_row
 
 class SessionTrackingBase(BaseModel):
     """Base schema with common session tracking fields"""
@@ -40,6 +40,22 @@ class SessionTrackingResponse(SessionTrackingBase):
     
     model_config = {'from_attributes': True}
 
+def session_tracking_response_row(session) -> dict:
+    """SessionTrackingResponse fields read straight off a SessionTracking row, without validation (bulk egress)"""
+    return {
+        "id": session.id,
+        "trainer_id": session.trainer_id,
+        "qr_code_id": session.qr_code_id,
+        "session_volume_id": session.session_volume_id,
+        "scan_timestamp": session.scan_timestamp,
+        "session_date": session.session_date,
+        "created_at": session.created_at,
+        "updated_at": session.updated_at,
+        "trainer": user_response_row(session.trainer),
+        "qr_code": qr_code_summary_row(session.qr_code),
+        "session_volume": session_volume_summary_row(session.session_volume),
+    }
+
 class SessionTrackingSummary(BaseModel):
     """Schema for session tracking summary (minimal info)"""
     id: UUID
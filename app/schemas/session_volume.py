@@ -3,7 +3,7 @@ from typing import Optional, Literal
 from pydantic import BaseModel, field_validator
 from uuid import UUID
 
-from .user import UserResponse
+from .user import UserResponse, user_response_row
 
 class SessionVolumeBase(BaseModel):
     """Base schema with common session volume fields"""
@@ -96,6 +96,29 @@ class SessionVolumeResponse(SessionVolumeBase):
     
     model_config = {'from_attributes': True}
 
+def session_volume_response_row(volume) -> dict:
+    """SessionVolumeResponse fields read straight off a SessionVolume row, without validation (bulk egress)"""
+    return {
+        "period": volume.period,
+        "session_count": volume.session_count,
+        "plans": volume.plans,
+        "notes": volume.notes,
+        "status": volume.status,
+        "id": volume.id,
+        "trainer_id": volume.trainer_id,
+        "customer_id": volume.customer_id,
+        "created_at": volume.created_at,
+        "updated_at": volume.updated_at,
+        "deleted_at": volume.deleted_at,
+        "customer": user_response_row(volume.customer),
+        "trainer": user_response_row(volume.trainer),
+        "is_active": volume.is_active,
+        "is_draft": volume.is_draft,
+        "is_submitted": volume.is_submitted,
+        "is_approved": volume.is_approved,
+        "is_rejected": volume.is_rejected,
+    }
+
 class SessionVolumeSummary(BaseModel):
     """Schema for session volume summary (minimal info)"""
     id: UUID
@@ -109,6 +132,22 @@ class SessionVolumeSummary(BaseModel):
     
     model_config = {'from_attributes': True}
 
+def session_volume_summary_row(volume) -> Optional[dict]:
+    """SessionVolumeSummary fields read straight off a SessionVolume row, without validation (bulk egress)"""
+    if volume is None:
+        return None
+    return {
+        "id": volume.id,
+        "trainer_id": volume.trainer_id,
+        "customer_id": volume.customer_id,
+        "period": volume.period,
+        "session_count": volume.session_count,
+        "status": volume.status,
+        # The model has no has_plans/has_notes attributes, so the schema defaults apply
+        "has_plans": False,
+        "has_notes": False,
+    }
+
 class SessionVolumeStatusUpdate(BaseModel):
     """Schema for updating session volume status"""
     status: Literal["draft", "submitted", "read", "approved", "rejected"]
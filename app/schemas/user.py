@@ -80,6 +80,24 @@ class UserResponse(UserBase):
     
     model_config = {'from_attributes': True}
 
+def user_response_row(user) -> Optional[dict]:
+    """UserResponse fields read straight off a User row, without validation (bulk egress)"""
+    if user is None:
+        return None
+    return {
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "phone_number": user.phone_number,
+        "location": user.location,
+        "active": user.active,
+        "id": user.id,
+        "role": user.role.name if user.role else None,
+        "created_at": user.created_at,
+        "updated_at": user.updated_at,
+        "deleted_at": user.deleted_at,
+    }
+
 class UserLogin(BaseModel):
     """Schema for user login"""
     email: EmailStr
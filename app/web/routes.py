@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Request, Depends, Form, HTTPException, status
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from itsdangerous import URLSafeTimedSerializer, BadSignature
 from uuid import UUID
@@ -84,7 +85,7 @@ async def login(
 ):
     """Process login form"""
     # Authenticate user
-    user = user_crud.authenticate(db, email=email, password=password)
+    user = await run_in_threadpool(user_crud.authenticate, db, email=email, password=password)
 
     if not user or not user_crud.is_active(user):
         return templates.TemplateResponse("login.html", {
@@ -184,7 +185,7 @@ async def change_password(
     db: Session = Depends(get_db)
 ):
     """Change user password"""
-    if not verify_password(current_password, user.password_hash):
+    if not await run_in_threadpool(verify_password, current_password, user.password_hash):
         return templates.TemplateResponse("profile.html", {
             "request": request,
             "user": user,
@@ -213,7 +214,7 @@ async def change_password(
         })
 
     try:
-        hashed_password = get_password_hash(new_password)
+        hashed_password = await run_in_threadpool(get_password_hash, new_password)
         user_crud.update(db, db_obj=user, obj_in={"password_hash": hashed_password})
 
         return templates.TemplateResponse("profile.html", {
@@ -297,7 +298,6 @@ async def trainers_page(
             Customer.trainer_id,
             func.count(Customer.user_id).label('customer_count')
         )
-        .filter(Customer.deleted_at.is_(None))
         .filter(Customer.trainer_id.isnot(None))
         .group_by(Customer.trainer_id)
         .all()
@@ -1,11 +1,15 @@
 import logging
 from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import configure_mappers
 
 from app.core.config import settings, setup_logging
-from app.core.database import create_tables
+from app.core.database import create_tables, warm_pool
+from app.core.user_cache import authenticated_user_cache
 from app.routes.routes import router
 from app.web.routes import router as web_router
 
@@ -15,8 +19,19 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(f"Starting up {settings.PROJECT_NAME} v{settings.VERSION}")
+    # Sync handlers and DB calls run in anyio's threadpool; more threads than pooled
+    # connections would only queue inside SQLAlchemy waiting for a connection
+    to_thread.current_default_thread_limiter().total_tokens = (
+        settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    )
+    # Resolve relationships now instead of on the first query after boot
+    configure_mappers()
     create_tables()
     logger.info("Database tables created/verified")
+    warm_pool()
+    logger.info(f"Database pool warmed with {settings.DB_POOL_SIZE} connections")
+    # Apply other workers' user changes to this worker's authenticated user cache
+    authenticated_user_cache.start_listener()
     yield
     logger.info("Application shutdown complete")
 
@@ -26,6 +41,7 @@ app = FastAPI(
     description="FastAPI application with PostgreSQL database and organized routing",
     version=settings.VERSION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -36,6 +52,16 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     from fastapi.exception_handlers import http_exception_handler as default_handler
     return await default_handler(request, exc)
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT: shed load instead of queueing
+    logger.warning(f"Database pool exhausted on {request.url.path}: {exc}")
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily overloaded, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(web_router)
 app.include_router(router)
@@ -47,5 +73,6 @@ if __name__ == "__main__":
         host=settings.HOST, 
         port=settings.PORT, 
         reload=settings.DEBUG_MODE,
+        access_log=settings.ACCESS_LOG,
         log_config=None  # Use our custom logging config
     )
\ No newline at end of file
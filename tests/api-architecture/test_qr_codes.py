@@ -38,7 +38,7 @@ def test_qr_codes():
         
         # Test key CRUD methods exist
         qr_methods = [
-            'get_by_token', 'get_by_user', 'generate_unique_token',
+            'get_by_token', 'get_by_user', 'generate_token',
             'create_for_user'
         ]
         
@@ -158,19 +158,7 @@ def test_qr_codes():
         import string
         
         # Test that we can generate a token (without DB)
-        # Mock a database session for testing
-        class MockDB:
-            def query(self, model):
-                return MockQuery()
-        
-        class MockQuery:
-            def filter(self, condition):
-                return self
-            def first(self):
-                return None  # No existing token
-        
-        mock_db = MockDB()
-        token = qr_code_crud.generate_unique_token(mock_db, length=16)
+        token = qr_code_crud.generate_token(length=16)
         
         if token and len(token) == 16 and all(c in string.ascii_letters + string.digits for c in token):
             print(f"    ✓ Token generation works (sample: {token})")
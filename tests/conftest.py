@@ -51,6 +51,10 @@ class MockUser:
         """Check if user has a specific role"""
         return bool(self.role and self.role.name == role_name)
     
+    def has_any_role(self, *role_names: str) -> bool:
+        """Check if user has any of the given roles"""
+        return self.role_name in role_names
+    
     def is_trainer(self) -> bool:
         """Check if user is a trainer"""
         return self.has_role("Trainer")
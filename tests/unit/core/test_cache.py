@@ -0,0 +1,36 @@
+import pytest
+from unittest.mock import patch
+
+import redis
+
+from app.core import cache
+
+
+@pytest.mark.unit
+class TestCache:
+    """Test the Redis cache helpers"""
+
+    def test_round_trips_json_values(self):
+        """Test values are stored as JSON and decoded on read"""
+        store = {}
+        with patch.object(cache, "redis_client") as client:
+            client.set.side_effect = lambda key, value, ex: store.__setitem__(key, value)
+            client.get.side_effect = store.get
+
+            cache.cache_set("qr:abc", {"user_id": "1", "active": True}, 60)
+
+            assert cache.cache_get("qr:abc") == {"user_id": "1", "active": True}
+            assert cache.cache_get("qr:missing") is None
+            client.set.assert_called_once()
+            assert client.set.call_args.kwargs["ex"] == 60
+
+    def test_redis_errors_are_treated_as_misses(self):
+        """Test an unavailable Redis never raises into the request"""
+        with patch.object(cache, "redis_client") as client:
+            client.get.side_effect = redis.ConnectionError("down")
+            client.set.side_effect = redis.ConnectionError("down")
+            client.delete.side_effect = redis.ConnectionError("down")
+
+            assert cache.cache_get("qr:abc") is None
+            cache.cache_set("qr:abc", {"user_id": "1"}, 60)
+            cache.cache_delete("qr:abc")
@@ -0,0 +1,29 @@
+import pytest
+from uuid import uuid4
+
+from fastapi import Response
+
+from app.core.pagination import NEXT_CURSOR_HEADER, set_next_cursor
+
+
+@pytest.mark.unit
+class TestSetNextCursor:
+    """Test advertising keyset cursors on list responses"""
+
+    def test_full_page_sets_cursor_to_last_id(self):
+        """Test a full page points the next cursor at its last row"""
+        response = Response()
+        ids = [uuid4(), uuid4()]
+
+        set_next_cursor(response, ids, limit=2)
+
+        assert response.headers[NEXT_CURSOR_HEADER] == str(ids[-1])
+
+    def test_short_page_has_no_cursor(self):
+        """Test the last (short or empty) page advertises no further cursor"""
+        for ids in ([uuid4()], []):
+            response = Response()
+
+            set_next_cursor(response, ids, limit=2)
+
+            assert NEXT_CURSOR_HEADER not in response.headers
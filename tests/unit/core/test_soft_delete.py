@@ -0,0 +1,40 @@
+import pytest
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import create_engine
+
+from app.core.database import SessionLocal
+from app.models.trainer import Trainer
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Trainer.__table__.create(engine)
+    session = SessionLocal(bind=engine)
+    live, deleted = uuid4(), uuid4()
+    session.add_all([Trainer(user_id=live), Trainer(user_id=deleted, deleted_at=datetime.utcnow())])
+    session.commit()
+    session.expunge_all()
+    yield session, live, deleted
+    session.close()
+
+
+@pytest.mark.unit
+class TestSoftDeleteCriteria:
+    """Test sessions hide soft-deleted SoftDeleteMixin rows"""
+
+    def test_selects_skip_deleted_rows(self, db):
+        """Test queries and primary key gets leave out soft-deleted rows"""
+        session, live, deleted = db
+
+        assert [trainer.user_id for trainer in session.query(Trainer)] == [live]
+        assert session.get(Trainer, deleted) is None
+
+    def test_include_deleted_opts_out(self, db):
+        """Test include_deleted returns soft-deleted rows too"""
+        session, live, deleted = db
+
+        trainers = session.query(Trainer).execution_options(include_deleted=True).all()
+
+        assert {trainer.user_id for trainer in trainers} == {live, deleted}
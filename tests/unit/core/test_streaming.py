@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import orjson
+
+from app.core import streaming
+
+
+def _response(batches):
+    db = MagicMock()
+    db.execute.return_value.scalars.return_value.partitions.return_value = iter(batches)
+    with patch.object(streaming, "SessionLocal", return_value=db):
+        response = streaming.stream_json_array(MagicMock(), lambda obj: {"name": obj})
+    return response, db
+
+
+def _body(response):
+    async def read():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(read())
+
+
+@pytest.mark.unit
+class TestStreamJsonArray:
+    """Test streaming ORM rows as a JSON array"""
+
+    def test_rows_form_a_json_array(self):
+        """Test rows are serialized through the row builder and framed as an array"""
+        response, db = _response([["a", "b"], ["c"]])
+
+        assert orjson.loads(_body(response)) == [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+        assert db.execute.call_args.kwargs["execution_options"] == {"yield_per": streaming.STREAM_BATCH_SIZE}
+        db.close.assert_called_once()
+
+    def test_no_rows_is_an_empty_array(self):
+        """Test an empty result still produces valid JSON"""
+        response, db = _response([])
+
+        assert orjson.loads(_body(response)) == []
+        db.close.assert_called_once()
+
+    def test_utc_datetimes_match_pydantic_format(self):
+        """Test UTC datetimes are written with a Z suffix like Pydantic's JSON"""
+        response, _ = _response([[datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)]])
+
+        assert orjson.loads(_body(response)) == [{"name": "2026-01-02T03:04:05Z"}]
+
+    def test_first_batch_errors_raise_before_streaming(self):
+        """Test a failing query or first batch raises from the handler, not mid-stream"""
+        db = MagicMock()
+        db.execute.side_effect = RuntimeError("db down")
+        with patch.object(streaming, "SessionLocal", return_value=db):
+            with pytest.raises(RuntimeError):
+                streaming.stream_json_array(MagicMock(), lambda obj: {"name": obj})
+        db.close.assert_called_once()
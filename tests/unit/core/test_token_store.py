@@ -0,0 +1,56 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from app.core.token_store import RefreshTokenStore
+
+
+def make_store():
+    """Build a store over a dict-backed stand-in for the Redis client"""
+    data = {}
+    client = MagicMock()
+
+    def set_(key, value, nx=False, ex=None):
+        if nx and key in data:
+            return None
+        data[key] = str(value).encode()
+        return True
+
+    client.set.side_effect = set_
+    client.get.side_effect = data.get
+    return RefreshTokenStore(client, ttl_seconds=60)
+
+
+@pytest.mark.unit
+class TestRefreshTokenStore:
+    """Test refresh token rotation and reuse detection"""
+
+    def test_rotate_succeeds_once(self):
+        """Test a refresh token can only be exchanged once"""
+        store = make_store()
+
+        assert store.rotate("jti-1")
+        assert not store.rotate("jti-1")
+
+    def test_rotation_is_shared_between_stores(self):
+        """Test a token rotated through one worker is rejected by another"""
+        first = make_store()
+        second = RefreshTokenStore(first._client, ttl_seconds=60)
+
+        assert first.rotate("jti-1")
+        assert not second.rotate("jti-1")
+
+    def test_is_revoked_by_issue_time(self):
+        """Test tokens issued before revocation are rejected"""
+        store = make_store()
+        user_id = str(uuid4())
+        issued_at = int(time.time()) - 10
+
+        assert not store.is_revoked(user_id, issued_at)
+
+        store.revoke_user(user_id)
+
+        assert store.is_revoked(user_id, issued_at)
+        assert not store.is_revoked(user_id, int(time.time()) + 10)
+        assert not store.is_revoked(str(uuid4()), issued_at)
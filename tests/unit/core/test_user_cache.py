@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import redis
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.user_cache import INVALIDATION_CHANNEL, AuthenticatedUserCache
+from app.models.role import Role
+from app.models.user import User
+
+
+def _detached_user():
+    role = Role(id=uuid4(), name="Trainer")
+    user = User(id=uuid4(), email="trainer@example.com", active=True, role=role, role_id=role.id)
+    make_transient_to_detached(role)
+    make_transient_to_detached(user)
+    return user
+
+
+@pytest.mark.unit
+class TestAuthenticatedUserCache:
+    """Test the per-process authenticated user cache"""
+
+    def test_set_get_and_invalidate(self):
+        """Test users are cached by id until invalidated"""
+        cache = AuthenticatedUserCache(ttl_seconds=60)
+        user = _detached_user()
+
+        assert cache.get(user.id) is None
+        cache.set(user)
+        assert cache.get(user.id) is user
+
+        cache.invalidate(user.id)
+        assert cache.get(user.id) is None
+
+    def test_token_subject_string_hits_uuid_entry(self):
+        """Test a token's subject string finds the user cached under its UUID"""
+        cache = AuthenticatedUserCache(ttl_seconds=60)
+        user = _detached_user()
+
+        cache.set(user)
+
+        assert cache.get(str(user.id)) is user
+        cache.invalidate(str(user.id))
+        assert cache.get(user.id) is None
+
+    def test_merged_copies_are_per_session(self):
+        """Test each request gets its own attached copy without touching the cached row"""
+        user = _detached_user()
+
+        first = Session().merge(user, load=False)
+        second = Session().merge(user, load=False)
+
+        assert first is not user and second is not first
+        assert first.role_name == second.role_name == "Trainer"
+
+    def test_invalidate_publishes_to_other_workers(self):
+        """Test invalidation drops the local entry and tells other workers"""
+        client = MagicMock()
+        cache = AuthenticatedUserCache(ttl_seconds=60, client=client)
+        user = _detached_user()
+
+        cache.set(user)
+        cache.invalidate(user.id)
+
+        assert cache.get(user.id) is None
+        client.publish.assert_called_once_with(INVALIDATION_CHANNEL, str(user.id))
+
+    def test_invalidate_survives_redis_errors(self):
+        """Test an unreachable Redis still drops the local entry"""
+        client = MagicMock()
+        client.publish.side_effect = redis.ConnectionError("down")
+        cache = AuthenticatedUserCache(ttl_seconds=60, client=client)
+        user = _detached_user()
+
+        cache.set(user)
+        cache.invalidate(user.id)
+
+        assert cache.get(user.id) is None
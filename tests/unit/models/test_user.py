@@ -78,6 +78,12 @@ class TestUserModel:
         assert user_with_customer_role.has_role("customer") is False
         assert user_with_customer_role.has_role("Customer") is True
     
+    def test_has_any_role(self, user_with_customer_role, sample_user):
+        """Test has_any_role matches any of the given roles"""
+        assert user_with_customer_role.has_any_role("Admin", "Customer") is True
+        assert user_with_customer_role.has_any_role("Admin", "Trainer") is False
+        assert sample_user.has_any_role("Admin", "Trainer") is False
+    
     def test_is_trainer_true(self, sample_user, trainer_role):
         """Test is_trainer method returns True"""
         sample_user.role = trainer_role
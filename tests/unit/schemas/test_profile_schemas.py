@@ -146,7 +146,6 @@ class TestProfileUpdate:
     def test_valid_profile_update(self):
         """Test valid ProfileUpdate"""
         update_data = {
-            "profile_picture_url": "https://example.com/newpic.jpg",
             "bio": "Updated bio",
             "emergency_contact": "Jane Smith - 555-4321",
             "preferences": {"theme": "light"}
@@ -154,7 +153,6 @@ class TestProfileUpdate:
         
         profile_update = ProfileUpdate(**update_data)
         
-        assert profile_update.profile_picture_url == "https://example.com/newpic.jpg"
         assert profile_update.bio == "Updated bio"
         assert profile_update.emergency_contact == "Jane Smith - 555-4321"
         assert profile_update.preferences == {"theme": "light"}
@@ -163,7 +161,6 @@ class TestProfileUpdate:
         """Test ProfileUpdate with no fields"""
         profile_update = ProfileUpdate()
         
-        assert profile_update.profile_picture_url is None
         assert profile_update.bio is None
         assert profile_update.emergency_contact is None
         assert profile_update.preferences == {}  # Validator converts None to {}
@@ -174,7 +171,6 @@ class TestProfileUpdate:
         
         assert profile_update.bio == "New bio"
         assert profile_update.preferences == {"notifications": False}
-        assert profile_update.profile_picture_url is None
         assert profile_update.emergency_contact is None
     
     def test_profile_update_bio_validation(self):
@@ -185,6 +181,12 @@ class TestProfileUpdate:
             ProfileUpdate(bio=bio_too_long)
         
         assert "Bio must be 1000 characters or less" in str(exc_info.value)
+    
+    def test_profile_update_ignores_picture_url(self):
+        """Test the picture URL can't be set through a profile update"""
+        profile_update = ProfileUpdate(profile_picture_url="https://x/profile_pictures/../../app.env")
+        
+        assert "profile_picture_url" not in profile_update.model_dump()
 
 
 @pytest.mark.unit
@@ -0,0 +1,89 @@
+import pytest
+from uuid import uuid4
+from datetime import date, datetime, timezone
+
+import orjson
+
+from app.core.responses import UTCORJSONResponse
+from app.models.profile import Profile
+from app.models.qr_code import QRCode
+from app.models.role import Role
+from app.models.session_tracking import SessionTracking
+from app.models.session_volume import SessionVolume
+from app.models.user import User
+from app.schemas.profile import ProfileResponse, profile_response_row
+from app.schemas.session_tracking import SessionTrackingResponse, session_tracking_response_row
+from app.schemas.session_volume import SessionVolumeResponse, session_volume_response_row
+
+
+def _as_json(row):
+    """Serialize a row the way the streaming list endpoints do"""
+    return orjson.loads(orjson.dumps(row, option=orjson.OPT_UTC_Z))
+
+
+@pytest.fixture
+def now():
+    return datetime(2026, 1, 15, 9, 30, 12, 345678, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def trainer(now):
+    return User(
+        id=uuid4(), email="trainer@example.com", first_name="Tina", last_name="Trainer",
+        active=True, role=Role(name="Trainer"), created_at=now, updated_at=now
+    )
+
+
+@pytest.fixture
+def customer(now):
+    return User(
+        id=uuid4(), email="customer@example.com", first_name="Cam", last_name="Customer",
+        phone_number="+1234567890", active=True, role=None, created_at=now, updated_at=now
+    )
+
+
+@pytest.fixture
+def volume(now, trainer, customer):
+    return SessionVolume(
+        id=uuid4(), trainer_id=trainer.id, customer_id=customer.id, period=date(2026, 1, 1),
+        session_count=3, plans="Legs", notes=None, status="submitted",
+        created_at=now, updated_at=now, trainer=trainer, customer=customer
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.schema
+class TestResponseRows:
+    """Test the validation-free row builders match their response schemas"""
+
+    def test_session_volume_row_matches_schema(self, volume):
+        """Test session_volume_response_row serializes like SessionVolumeResponse"""
+        expected = SessionVolumeResponse.model_validate(volume).model_dump(mode="json")
+
+        assert _as_json(session_volume_response_row(volume)) == expected
+
+    def test_session_tracking_row_matches_schema(self, now, trainer, customer, volume):
+        """Test session_tracking_response_row serializes like SessionTrackingResponse"""
+        qr_code = QRCode(id=uuid4(), user_id=customer.id, token="abc123", created_at=now, updated_at=now)
+        session = SessionTracking(
+            id=uuid4(), trainer_id=trainer.id, qr_code_id=qr_code.id, session_volume_id=volume.id,
+            scan_timestamp=now, session_date=now.date(), created_at=now, updated_at=now,
+            trainer=trainer, qr_code=qr_code, session_volume=volume
+        )
+
+        expected = SessionTrackingResponse.model_validate(session).model_dump(mode="json")
+
+        assert _as_json(session_tracking_response_row(session)) == expected
+
+    def test_profile_row_matches_schema(self, now, customer):
+        """Test the /profiles/me fast path serializes like ProfileResponse, UTC as "Z" included"""
+        profile = Profile(
+            user_id=customer.id, profile_picture_url=None, bio="Hi", emergency_contact=None,
+            preferences=None, created_at=now, updated_at=now, user=customer
+        )
+
+        expected = ProfileResponse.model_validate(profile).model_dump(mode="json")
+        body = UTCORJSONResponse(content=profile_response_row(profile, customer)).body
+
+        assert orjson.loads(body) == expected
+        assert expected["created_at"].endswith("Z")